@@ -0,0 +1,154 @@
+import os
+import re
+
+import pandas as pd
+
+
+UNCATEGORIZED = 'uncategorized'
+
+# (keyword, category, merchant[, prefix]). Keywords are matched on the normalized description
+# (see normalize) as whole words. Rules with prefix=True also match at the start of a longer
+# word, for brands that statements run together with a location or legal suffix
+# ('FitXDeutschland', 'TESCOSTORES', 'SpotifyAB') or truncate ('SAINSBUR Y'). When several
+# match, the leftmost one wins, and among those starting at the same place the longest keyword.
+# Personal merchants belong in a user rules file (see load_rules), not here.
+DEFAULT_RULES = [
+    # groceries
+    ('REWE', 'groceries', 'REWE'), ('EDEKA', 'groceries', 'EDEKA'), ('ALDI', 'groceries', 'ALDI'),
+    ('LIDL', 'groceries', 'LIDL'), ('NETTO', 'groceries', 'Netto'), ('KAUFLAND', 'groceries', 'Kaufland', True),
+    ('TESCO', 'groceries', 'Tesco', True), ('SAINSBUR', 'groceries', "Sainsbury's", True),
+    ('WAITROSE', 'groceries', 'Waitrose', True),
+    ('BIGBASKET', 'groceries', 'BigBasket', True), ('BLINKIT', 'groceries', 'Blinkit', True), ('DMART', 'groceries', 'DMart'),
+    # fuel
+    ('ARAL', 'fuel', 'Aral'), ('SHELL', 'fuel', 'Shell'), ('ESSO', 'fuel', 'Esso'),
+    ('TOTALENERGIES', 'fuel', 'TotalEnergies', True),
+    ('INDIAN OIL', 'fuel', 'Indian Oil'), ('HPCL', 'fuel', 'HPCL'), ('BPCL', 'fuel', 'BPCL'),
+    # brokerage / investing transfers
+    ('ZERODHA', 'brokerage', 'Zerodha', True), ('GROWW', 'brokerage', 'Groww'), ('UPSTOX', 'brokerage', 'Upstox', True),
+    ('TRADE REPUBLIC', 'brokerage', 'Trade Republic'), ('SCALABLE CAPITAL', 'brokerage', 'Scalable Capital'),
+    ('INTERACTIVE BROKERS', 'brokerage', 'Interactive Brokers'), ('DEGIRO', 'brokerage', 'DEGIRO', True),
+    # income
+    ('LOHN GEHALT', 'salary', None), ('VERDIENSTABRECHNUNG', 'salary', None), ('SALARY', 'salary', None),
+    # transport
+    ('RAILLINK', 'transport', None), ('GREATERANGLIA', 'transport', 'Greater Anglia', True),
+    ('DB VERTRIEB', 'transport', 'Deutsche Bahn'),
+    ('UBER', 'transport', 'Uber'), ('BUS', 'transport', None), ('TFL', 'transport', 'TfL'),
+    # eating out
+    ('COFFEE', 'eating out', None), ('CAFE', 'eating out', None), ('RESTAURANT', 'eating out', None),
+    ('CAFFENERO', 'eating out', 'Caffè Nero', True), ('PRETAMANGER', 'eating out', 'Pret A Manger', True),
+    ('SWIGGY', 'eating out', 'Swiggy', True), ('ZOMATO', 'eating out', 'Zomato', True),
+    # travel / lodging
+    ('HOTEL', 'travel', None, True), ('AIRBNB', 'travel', 'Airbnb', True), ('BOOKING COM', 'travel', 'Booking.com'),
+    ('LUFTHANSA', 'travel', 'Lufthansa', True), ('INDIGO', 'travel', 'IndiGo'),
+    ('INTERGLOBE AVIATION', 'travel', 'IndiGo', True),
+    # subscriptions / fitness
+    ('FITX', 'fitness', 'FitX', True), ('NETFLIX', 'subscriptions', 'Netflix', True),
+    ('SPOTIFY', 'subscriptions', 'Spotify', True),
+    # cash
+    ('BARGELDAUSZAHLUNG', 'cash', None), ('ATM', 'cash', None),
+]
+
+USER_RULES_FILE = 'user_rules.csv'    # keyword,category,merchant,prefix
+
+_NOISE = re.compile(r'\d{2}-\d{2}-\d{4}T\d{2}:\d{2}:\d{2}|KARTENNR\s*\.?\s*\d+|\d{4,}')
+_NON_ALNUM = re.compile(r'[^A-Z0-9]+')
+
+
+def normalize(s):
+    """Uppercase, drop card numbers / timestamps / long reference numbers, collapse punctuation to single spaces."""
+    s = _NOISE.sub(' ', str(s).upper())
+    return ' '.join(_NON_ALNUM.sub(' ', s).split())
+
+
+def load_rules(path=USER_RULES_FILE):
+    """
+    Rules from a CSV with columns keyword, category, merchant, prefix (merchant and
+    prefix optional), or [] if the file does not exist. Put them ahead of DEFAULT_RULES
+    so they win: Categorizer(load_rules() + DEFAULT_RULES).
+    """
+    if not os.path.exists(path):
+        return []
+    rows = pd.read_csv(path, dtype=str, keep_default_na=False).to_dict('records')
+    return [(r['keyword'], r['category'], r.get('merchant') or None,
+             r.get('prefix', '').strip().lower() in ('1', 'true', 'yes')) for r in rows]
+
+
+class Categorizer:
+    """
+    All keyword rules compiled into one alternation regex, applied once per distinct
+    normalized description; results are cached across calls.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES):
+        self.lookup, prefix = {}, set()
+        for keyword, category, merchant, *flags in rules:
+            k = normalize(keyword)
+            if k not in self.lookup:
+                self.lookup[k] = (category, merchant)
+                if flags and flags[0]:
+                    prefix.add(k)
+        keywords = sorted(self.lookup, key=len, reverse=True)
+        alternatives = (re.escape(k) + ('' if k in prefix else r'\b') for k in keywords)
+        self.pattern = re.compile(r'\b(' + '|'.join(alternatives) + ')')
+        self.cache = {}
+
+    def match(self, normalized):
+        """(category, merchant, keyword) for one normalized description."""
+        m = self.pattern.search(normalized)
+        if not m:
+            return UNCATEGORIZED, None, None
+        return self.lookup[m.group(1)] + (m.group(1),)
+
+    def categorize(self, df, text_columns=('type', 'description')):
+        """Copy of df with 'category', 'merchant' and 'matched_keyword' columns."""
+        text = df[text_columns[0]].fillna('').astype(str)
+        for col in text_columns[1:]:
+            text = text + ' ' + df[col].fillna('').astype(str)
+
+        # normalize and match each distinct text once, in bulk
+        raw = pd.Series(pd.unique(text), dtype=object)
+        norm = raw.map(normalize)
+        new = pd.Series(pd.unique(norm[~norm.isin(self.cache.keys())]), dtype=object)
+        if len(new):
+            keywords = new.str.extract(self.pattern, expand=False)
+            for d, k in zip(new, keywords):
+                self.cache[d] = (UNCATEGORIZED, None, None) if pd.isna(k) else self.lookup[k] + (k,)
+
+        hits = pd.DataFrame(norm.map(self.cache).tolist(), index=raw.values,
+                            columns=['category', 'merchant', 'matched_keyword'])
+        out = df.copy()
+        for col in hits.columns:
+            out[col] = text.map(hits[col]).values
+        out['category'] = out['category'].astype('category')
+        return out
+
+
+def monthly_rollup(df, value='signed_amount'):
+    """month x category totals of a categorized frame (debits negative, as in signed_amount)."""
+    month = df['date'].dt.to_period('M').rename('month')
+    return df.groupby([month, df['category']], observed=True)[value].sum().unstack('category', fill_value=0.0)
+
+
+def top_merchants(df, n=10):
+    spend = df[df['signed_amount'] < 0]
+    merchant = spend['merchant'].fillna(spend['matched_keyword']).fillna(UNCATEGORIZED)
+    return (spend.groupby(merchant)['amount'].agg(['sum', 'count'])
+            .sort_values('sum', ascending=False).head(n))
+
+
+def coverage(df):
+    """Share of rows and of debit volume a categorized frame assigns to a category."""
+    hit = df['category'] != UNCATEGORIZED
+    debit = df['signed_amount'] < 0
+    return {'rows': int(len(df)), 'categorized': int(hit.sum()), 'row_share': float(hit.mean()),
+            'debit_share': float(df.loc[hit & debit, 'amount'].sum() / df.loc[debit, 'amount'].sum())}
+
+
+if __name__ == "__main__":
+    # check the rules against the sample statement shipped next to this file
+    from statement_ingest import parse_transactions, extract_pages
+    here = os.path.dirname(os.path.abspath(__file__))
+    rules = load_rules(os.path.join(here, USER_RULES_FILE)) + DEFAULT_RULES
+    txns = Categorizer(rules).categorize(parse_transactions(extract_pages(os.path.join(here, 'payment_history.PDF'))))
+    print(coverage(txns))
+    print(txns[txns['category'] == UNCATEGORIZED][['date', 'type', 'description']].to_string())
@@ -0,0 +1,202 @@
+import os
+import re
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import PyPDF2
+
+
+PARALLEL_MIN_PAGES = 40   # below this, a process pool costs more than it saves
+PAGES_PER_TASK = 20
+CACHE_DIR = '.statement_cache'
+PARSER_VERSION = 2        # bump to invalidate cached parses when the parsers change
+
+TRANSACTION_COLUMNS = ['date', 'type', 'description', 'amount', 'direction', 'signed_amount']
+
+
+def iter_pages(file_path, start=0, stop=None):
+    """Yield (page_number, text) lazily; only the pages actually consumed are extracted."""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        stop = len(pdf_reader.pages) if stop is None else min(stop, len(pdf_reader.pages))
+        for page_num in range(start, stop):
+            yield page_num, pdf_reader.pages[page_num].extract_text() or ''
+
+
+def _extract_range(args):
+    file_path, start, stop = args
+    return [text for _, text in iter_pages(file_path, start, stop)]
+
+
+def extract_pages(file_path, workers=None):
+    """
+    Text of every page, in order. Large files are split into page ranges that are
+    extracted across a process pool; small ones are read serially.
+    """
+    with open(file_path, 'rb') as file:
+        num_pages = len(PyPDF2.PdfReader(file).pages)
+    if num_pages < PARALLEL_MIN_PAGES or workers == 1:
+        return [text for _, text in iter_pages(file_path)]
+    ranges = [(file_path, s, min(s + PAGES_PER_TASK, num_pages)) for s in range(0, num_pages, PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [text for chunk in pool.map(_extract_range, ranges) for text in chunk]
+
+
+# ---------- statement parsers: list of page texts -> list of transaction dicts ----------
+
+_DE_AMOUNT = r'[+-]\d{1,3}(?:\.\d{3})*,\d{2}'
+_DE_START = re.compile(rf'^({_DE_AMOUNT})\s+(?!EUR)(\S.*)$')
+_DE_DATE = re.compile(r'(\d{2})\.(\d{2})\.\s*(\d{4})')
+_DE_STOP = ('NeuerSaldo', 'IBAN von Seite', 'Deutsche BankAG', 'AlterSaldo', 'Haben Soll Vorgang')
+
+
+def _de_number(s):
+    return float(s.replace('.', '').replace(',', '.'))
+
+
+def _parse_deutsche_bank(pages):
+    """Deutsche Bank 'Kontoauszug': '-29,00 <Vorgang>' opens a booking, details follow on the next lines."""
+    txns, current = [], None
+    for line in (l.strip() for page in pages for l in page.splitlines()):
+        m = _DE_START.match(line)
+        if m:
+            current = {'amount': _de_number(m.group(1)), 'type': m.group(2), 'lines': []}
+            txns.append(current)
+        elif line.startswith(_DE_STOP):
+            current = None
+        elif current is not None:
+            current['lines'].append(line)
+
+    out = []
+    for t in txns:
+        body = '\n'.join(t['lines'])
+        d = _DE_DATE.search(body)
+        desc = _DE_DATE.sub(' ', body).replace('Verwendungszweck/ Kundenreferenz', ' ')
+        out.append({
+            'date': f'{d.group(1)}.{d.group(2)}.{d.group(3)}' if d else None,
+            'type': t['type'],
+            'description': ' '.join(desc.split()),
+            'signed_amount': t['amount'],
+        })
+    return out
+
+
+_SIMPLE_AMOUNT = r'[+-]?\d[\d,]*\.\d{2}'
+_SIMPLE_LINE = re.compile(
+    rf'^(\d{{2}}[/.-]\d{{2}}[/.-]\d{{2,4}})\s+(.+?)\s+({_SIMPLE_AMOUNT})\s*(Dr|Cr|DR|CR)?'
+    rf'(?:\s+({_SIMPLE_AMOUNT})\s*(?:Dr|Cr|DR|CR)?)?$'
+)
+_BALANCE_ONLY = re.compile(r'\b(?:OPENING|CLOSING)\s+BALANCE\b|\b[BC]/F\b', re.IGNORECASE)
+
+
+def _simple_number(s):
+    return float(s.replace(',', ''))
+
+
+def _parse_simple(pages):
+    """
+    One transaction per line: '<dd/mm/yyyy> <description> <amount> [Dr|Cr] [<balance>]'
+    (typical Indian bank/card exports). The first amount after the description is the
+    transaction; a trailing number is the running balance. Direction comes from the Dr/Cr
+    marker or an explicit sign, else from the change in running balance, else from the
+    statement's convention: unmarked amounts are credits when other lines mark debits,
+    and debits otherwise (card exports mark only payments, as Cr).
+    Opening / closing balance lines only seed the running balance.
+    """
+    rows = []
+    for line in (l.strip() for page in pages for l in page.splitlines()):
+        m = _SIMPLE_LINE.match(line)
+        if not m:
+            continue
+        if _BALANCE_ONLY.search(m.group(2)):
+            # not a transaction, but it anchors the running balance of the next line
+            rows.append({'balance_only': _simple_number(m.group(5) or m.group(3))})
+            continue
+        rows.append({'date': m.group(1), 'description': m.group(2), 'amount': m.group(3),
+                     'marker': (m.group(4) or '').lower(),
+                     'balance': _simple_number(m.group(5)) if m.group(5) else None})
+
+    unmarked_sign = 1.0 if any(r.get('marker') == 'dr' for r in rows) else -1.0
+    out, prev_balance = [], None
+    for r in rows:
+        if 'balance_only' in r:
+            prev_balance = r['balance_only']
+            continue
+        amount = _simple_number(r['amount'])
+        if r['marker']:
+            sign = -1.0 if r['marker'] == 'dr' else 1.0
+        elif r['amount'][0] in '+-':
+            sign = -1.0 if amount < 0 else 1.0
+        elif (r['balance'] is not None and prev_balance is not None
+              and abs(abs(r['balance'] - prev_balance) - amount) < 0.005 and r['balance'] != prev_balance):
+            sign = 1.0 if r['balance'] > prev_balance else -1.0
+        else:
+            sign = unmarked_sign
+        prev_balance = r['balance'] if r['balance'] is not None else prev_balance
+        out.append({'date': r['date'], 'type': None, 'description': r['description'],
+                    'signed_amount': sign * abs(amount)})
+    return out
+
+
+PARSERS = {
+    'deutsche_bank': _parse_deutsche_bank,
+    'simple': _parse_simple,
+}
+
+
+def parse_transactions(pages, fmt='deutsche_bank'):
+    """Parse page texts into a typed transactions DataFrame (TRANSACTION_COLUMNS)."""
+    df = pd.DataFrame(PARSERS[fmt](pages), columns=['date', 'type', 'description', 'signed_amount'])
+    df['date'] = pd.to_datetime(df['date'], dayfirst=True, errors='coerce')
+    df['signed_amount'] = df['signed_amount'].astype(float)
+    df['amount'] = df['signed_amount'].abs()
+    df['direction'] = pd.Categorical(
+        df['signed_amount'].map(lambda v: 'credit' if v > 0 else 'debit'), categories=['debit', 'credit']
+    )
+    df['type'] = df['type'].astype('string')
+    df['description'] = df['description'].astype('string')
+    return df[TRANSACTION_COLUMNS]
+
+
+# ---------- cached ingestion ----------
+
+def file_hash(file_path):
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def ingest_pdf(file_path, fmt='deutsche_bank', cache_dir=CACHE_DIR, workers=None):
+    """Parsed transactions of one statement; re-parses only if the file's content hash is new."""
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f'{file_hash(file_path)}_{fmt}_v{PARSER_VERSION}.pkl')
+    if os.path.exists(cache_path):
+        return pd.read_pickle(cache_path)
+    df = parse_transactions(extract_pages(file_path, workers=workers), fmt=fmt)
+    df.to_pickle(cache_path + '.tmp')
+    os.replace(cache_path + '.tmp', cache_path)
+    return df
+
+
+def ingest_folder(folder, fmt='deutsche_bank', cache_dir=CACHE_DIR, workers=None):
+    """All statements (*.pdf, any case) in folder as one DataFrame with a 'source' column."""
+    frames = []
+    for fname in sorted(os.listdir(folder)):
+        if not fname.lower().endswith('.pdf'):
+            continue
+        try:
+            df = ingest_pdf(os.path.join(folder, fname), fmt=fmt, cache_dir=cache_dir, workers=workers)
+        except Exception as e:
+            print(f"An error occurred while ingesting {fname}: {str(e)}")
+            continue
+        frames.append(df.assign(source=fname))
+    if not frames:
+        return pd.DataFrame(columns=TRANSACTION_COLUMNS + ['source'])
+    return pd.concat(frames, ignore_index=True).sort_values('date', kind='stable').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    print(ingest_folder('.'))
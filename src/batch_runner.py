@@ -0,0 +1,170 @@
+import os
+import re
+import json
+import pickle
+import datetime as dt
+
+import pandas as pd
+
+from src.buy_logic import buy_score, bundle_name, missing_pillars, TICKER_DF_COLUMNS
+from src.helper_functions import score_label, _atomic_pickle
+from src.data_fetch import fetch_bundle
+
+
+JOURNAL_FILE = 'journal.jsonl'
+BUNDLE_DIR = 'bundles'
+MAX_ATTEMPTS = 3   # failures (across runs) before a ticker is dead-lettered
+
+
+def _safe_name(ticker):
+    return re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+
+
+def _append_journal(run_dir, entry):
+    entry = dict(entry, ts=dt.datetime.now().isoformat(timespec='seconds'))
+    with open(os.path.join(run_dir, JOURNAL_FILE), 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_journal(run_dir):
+    """
+    Replay the journal into {ticker: state}; state carries the latest entry plus
+    the number of failed attempts seen so far. A torn last line (crash mid-write) is ignored.
+    """
+    state = {}
+    path = os.path.join(run_dir, JOURNAL_FILE)
+    if not os.path.exists(path):
+        return state
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            prev = state.get(entry['ticker'], {})
+            if entry['status'] == 'reset':
+                failures = 0
+            else:
+                failures = prev.get('failures', 0) + (entry['status'] in ('failed', 'dead'))
+            state[entry['ticker']] = dict(entry, failures=failures)
+    return state
+
+
+def _score(bundle, importance_factors):
+    """Journal fields for one scored bundle: name, metric values and the weights used."""
+    missing = missing_pillars(bundle, importance_factors)
+    if missing:
+        raise ValueError(f'bundle was fetched without the rows for {missing}')
+    sc, metric_vals = buy_score(bundle['fund'], bundle['inc_q'], bundle['cf_q'], bundle['bs_q'],
+                                bundle['inc_y'], bundle['cf_y'], importance_factors)
+    return {'name': bundle_name(bundle),
+            'metrics': [None if pd.isna(v) else float(v) for v in metric_vals],
+            'weights': dict(importance_factors)}
+
+
+def run_batch(tickers, run_dir, fetch=fetch_bundle, importance_factors=None, max_attempts=MAX_ATTEMPTS):
+    """
+    Fetch (and optionally score) every ticker, journaling each completed one to run_dir.
+    Re-running with the same run_dir resumes: completed tickers are not refetched, and
+    tickers that failed max_attempts times are moved to the dead-letter list. Completed
+    tickers are rescored from their saved bundle when they have no score yet or were
+    scored with other importance_factors (the weights are journaled with every score);
+    a bundle whose fetch plan lacks rows the new weights need is refetched first.
+    A scoring error keeps the bundle and is journaled as 'score_error', not as a fetch failure.
+    Returns the journal state.
+    """
+    os.makedirs(os.path.join(run_dir, BUNDLE_DIR), exist_ok=True)
+    state = read_journal(run_dir)
+
+    for ticker in dict.fromkeys(tickers):
+        prev = state.get(ticker, {})
+        if prev.get('status') == 'dead':
+            continue
+        bundle = None
+        if prev.get('status') == 'done':
+            if importance_factors is None or prev.get('weights') == dict(importance_factors):
+                continue
+            with open(os.path.join(run_dir, prev['bundle']), 'rb') as f:
+                bundle = pickle.load(f)
+            entry = {'ticker': ticker, 'status': 'done', 'bundle': prev['bundle']}
+            if missing_pillars(bundle, importance_factors):
+                print(f'{ticker} was fetched for other weights, refetching')
+                bundle = None
+        if bundle is None:
+            print(f'scraping: {ticker}')
+            try:
+                bundle = fetch(ticker)
+                bundle_path = os.path.join(BUNDLE_DIR, _safe_name(ticker) + '.pkl')
+                _atomic_pickle(bundle, os.path.join(run_dir, bundle_path))
+            except Exception as e:
+                print(f'error scraping {ticker}: {e}')
+                failures = prev.get('failures', 0) + 1
+                status = 'dead' if failures >= max_attempts else 'failed'
+                entry = {'ticker': ticker, 'status': status, 'error': str(e)}
+                _append_journal(run_dir, entry)
+                state[ticker] = dict(entry, failures=failures)
+                continue
+            entry = {'ticker': ticker, 'status': 'done', 'bundle': bundle_path}
+
+        if importance_factors is not None:
+            try:
+                entry.update(_score(bundle, importance_factors))
+            except Exception as e:
+                print(f'error scoring {ticker}: {e}')
+                entry['score_error'] = str(e)
+        _append_journal(run_dir, entry)
+        state[ticker] = dict(entry, failures=prev.get('failures', 0))
+
+    return state
+
+
+def dead_letters(run_dir):
+    return {t: s.get('error') for t, s in read_journal(run_dir).items() if s['status'] == 'dead'}
+
+
+def retry_dead_letters(run_dir, tickers=None):
+    """Give dead-lettered tickers (all, or just `tickers`) a fresh set of attempts on the next run."""
+    for t in dead_letters(run_dir):
+        if tickers is None or t in tickers:
+            _append_journal(run_dir, {'ticker': t, 'status': 'reset'})
+
+
+def load_bundles(run_dir, tickers=None):
+    """Completed bundles from the journal, in `tickers` order (journal order if None)."""
+    state = read_journal(run_dir)
+    order = state.keys() if tickers is None else dict.fromkeys(tickers)
+    bundles = []
+    for t in order:
+        s = state.get(t)
+        if s and s['status'] == 'done':
+            with open(os.path.join(run_dir, s['bundle']), 'rb') as f:
+                bundles.append(pickle.load(f))
+    return bundles
+
+
+def load_rankings(run_dir):
+    """
+    Rebuild (rankings, ticker_df) like rank_stocks from the scores journaled by
+    run_batch(..., importance_factors=...), without rescoring. Completed tickers without
+    a score are reported; scores journaled under different weights raise ValueError
+    (re-run run_batch with one set of importance_factors to rescore them).
+    """
+    state = read_journal(run_dir)
+    done = {t: s for t, s in state.items() if s['status'] == 'done'}
+    unscored = {t: s.get('score_error', 'not scored') for t, s in done.items() if 'metrics' not in s}
+    if unscored:
+        print(f'{len(unscored)} fetched tickers have no score and are left out: {unscored}')
+    scored = {t: s for t, s in done.items() if 'metrics' in s}
+    weightings = {json.dumps(s.get('weights'), sort_keys=True) for s in scored.values()}
+    if len(weightings) > 1:
+        raise ValueError(f'{run_dir} mixes scores from {len(weightings)} sets of importance_factors')
+
+    ticker_df = pd.DataFrame(columns=TICKER_DF_COLUMNS)
+    out = []
+    for t, s in scored.items():
+        metric_vals = [float('nan') if v is None else v for v in s['metrics']]
+        ticker_df.loc[len(ticker_df)] = [s['name'], t] + metric_vals
+        out.append((s['name'], metric_vals[-1], score_label(metric_vals[-1])))
+    return sorted(out, key=lambda x: x[1], reverse=True), ticker_df
@@ -9,14 +9,100 @@ import yfinance as yf
 import math
 
 from src.helper_functions import (
-    _to_float, _to_pct, _pos, _neg, 
+    _to_float, _to_pct,
     _series_recentN, _weighted_recent, _safe_cv, 
     _blend, _median, score_label
 )
 from src.data_preprocessing import extract_from_statements
 
 
-def buy_score(info_dict, income_q, cashflow_q, balance_q, income_y, cashflow_y, importance_factors):
+# statement rows each pillar reads (via buy_score / extract_from_statements), per bundle key.
+# Keep in sync with the scoring code: src/fetch_planner.py derives the minimal fetch from this.
+PILLAR_REQUIREMENTS = {
+    'growth':        {'inc_q': ['Total Revenue', 'Operating Margin'],
+                      'inc_y': ['Total Revenue', 'Operating Margin']},
+    'profitability': {'inc_q': ['Total Revenue'], 'cf_q': ['Free Cash Flow']},
+    'valuation':     {'inc_q': ['Total Revenue'], 'inc_y': ['Total Revenue']},   # rev growth feeds the GAV fallback
+    'safety':        {'bs_q': ['Current Assets', 'Current Liabilities', 'Total Debt', 'Stockholders Equity']},
+    'stability':     {'inc_q': ['Total Revenue'], 'inc_y': ['Total Revenue']},
+    'moat':          {'inc_q': ['Gross Profit', 'Total Revenue'], 'inc_y': ['Gross Profit', 'Total Revenue']},
+    'rd_score':      {'inc_q': ['Research And Development', 'Total Revenue'],
+                      'inc_y': ['Research And Development', 'Total Revenue']},
+    'invest_score':  {'cf_q': ['Capital Expenditure', 'Operating Cash Flow'],
+                      'cf_y': ['Capital Expenditure', 'Operating Cash Flow']},
+}
+
+
+def missing_pillars(bundle, importance_factors):
+    """
+    Weighted pillars whose PILLAR_REQUIREMENTS a bundle fetched or pruned to a plan
+    (bundle['plan'], see src.fetch_planner) does not cover. Unplanned bundles cover all.
+    """
+    plan = bundle.get('plan')
+    if plan is None:
+        return []
+    return [p for p, reqs in PILLAR_REQUIREMENTS.items()
+            if importance_factors.get(p, 0)
+            and any(key not in plan or not set(labels) <= set(plan[key]) for key, labels in reqs.items())]
+
+
+SCORE_INPUTS = ['gm', 'om', 'roe', 'fpe', 'peg', 'ev_ebitda', 'rev_g', 'fcf_margin', 'debt_eq', 'curr_ratio',
+                'om_change', 'om_y_change', 'stability', 'moat', 'rd_intensity', 'invest_ratio']
+
+
+# order matches importance_factors
+PILLARS = ['growth', 'profitability', 'valuation', 'safety', 'stability', 'moat', 'rd_score', 'invest_score']
+
+
+def _pos_v(x, lo, hi):
+    return np.where(np.isnan(x), 0.0, np.clip((x - lo) / (hi - lo), 0.0, 1.0))
+
+
+def _neg_v(x, lo, hi):
+    return np.where(np.isnan(x), 0.0, np.clip(1.0 - (x - lo) / (hi - lo), 0.0, 1.0))
+
+
+def pillar_matrix(X):
+    """
+    Pillar subscores (0..1) from raw inputs. X: [..., SCORE_INPUTS] with any leading axes
+    (tickers, or simulations x tickers). Returns [..., PILLARS]. buy_score calls this on a
+    single row, so the thresholds and fallbacks below are the model's only copy.
+    """
+    x = {k: X[..., i] for i, k in enumerate(SCORE_INPUTS)}
+
+    growth = (_pos_v(x['rev_g'], 5, 40)*0.5 +
+              _pos_v(x['om_change'], 0, 12)*0.2 +
+              _pos_v(x['om_y_change'], 0, 8)*0.3)
+
+    profitability = (_pos_v(x['gm'], 40, 70) + _pos_v(x['om'], 15, 45) +
+                     _pos_v(x['roe'], 10, 40) + _pos_v(x['fcf_margin'], 5, 35)) / 4.0
+
+    V_PE = _neg_v(x['fpe'], 12, 45)
+    V_EV = _neg_v(x['ev_ebitda'], 6, 30)
+    ev, rev_g, peg = x['ev_ebitda'], x['rev_g'], x['peg']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gav = np.where((ev > 0) & (rev_g > 0), ev / rev_g, np.nan)
+    V_driver = np.where(peg > 0, _neg_v(peg, 0.5, 3.0),
+                        np.where(np.isnan(gav), V_PE, _neg_v(gav, 0.4, 2.5)))
+    valuation = 0.5*V_PE + 0.3*V_EV + 0.2*V_driver
+
+    safety = (_neg_v(x['debt_eq'], 0.0, 1.0) + _pos_v(x['curr_ratio'], 1.0, 3.0)) / 2.0
+
+    stability = np.where(np.isnan(x['stability']), 0.5, x['stability'])
+    moat = np.where(np.isnan(x['moat']), 0.5, x['moat'])
+    rd_score = np.where(np.isnan(x['rd_intensity']), 0.0, _pos_v(x['rd_intensity'], 5, 22))
+    invest_sc = np.where(np.isnan(x['invest_ratio']), 0.5, _neg_v(x['invest_ratio'], 15, 60))
+
+    return np.stack([growth, profitability, valuation, safety, stability, moat, rd_score, invest_sc], axis=-1)
+
+
+def score01(P, importance_factors):
+    """Weighted pillar sum (0..1) over the last axis of P, added up in PILLARS order."""
+    return sum(importance_factors[p]*P[..., i] for i, p in enumerate(PILLARS))
+
+
+def score_inputs(info_dict, income_q, cashflow_q, balance_q, income_y, cashflow_y):
+    """Raw inputs buy_score normalises into subscores, keyed by SCORE_INPUTS."""
     # Profitability snapshot (convert decimals → %)
     gm  = _to_pct(info_dict.get('grossMargins', 0))
     om  = _to_pct(info_dict.get('operatingMargins', 0))
@@ -32,12 +118,6 @@ def buy_score(info_dict, income_q, cashflow_q, balance_q, income_y, cashflow_y,
         info_dict, income_q, cashflow_q, balance_q, income_y, cashflow_y
     )
 
-    # Core subscores
-    
-    ##### growth
-
-    # growth = _pos(rev_g, 5, 40)
-
     # improving recent quarterly operating margin
     if ('Operating Margin' in income_q.index) and income_q.shape[1] >= 5:
         om_now  = _to_float(income_q.loc['Operating Margin'].iloc[0])
@@ -54,73 +134,22 @@ def buy_score(info_dict, income_q, cashflow_q, balance_q, income_y, cashflow_y,
     else:
         om_y_change = 0.0
 
-    growth = (
-        _pos(rev_g, 5, 40)*0.5 +     # growth rewarded
-        _pos(om_change, 0, 12)*0.2+
-        _pos(om_y_change, 0, 8)*0.3 # margin expansion rewarded
-    )
-    
-
-    ##### profitability
-    profitability = (
-        _pos(gm, 40, 70) +
-        _pos(om, 15, 45) +
-        _pos(roe, 10, 40) +
-        _pos(fcf_margin, 5, 35)
-    ) / 4.0
-
+    vals = [gm, om, roe, fpe, peg, ev_ebitda, rev_g, fcf_margin, debt_eq, curr_ratio,
+            om_change, om_y_change, stability, moat, rd_intensity, invest_ratio]
+    return dict(zip(SCORE_INPUTS, vals))
 
-    ##### valuation
-    # if peg <= 0:
-    #     valuation = _neg(fpe, 10, 45)
-    # else:
-    #     valuation = (_neg(fpe, 10, 45) + _neg(peg, 0.5, 3.0)) / 2.0
-
-    # Component scores
-    V_PE = _neg(fpe, 12, 45)
-    V_EV = _neg(ev_ebitda, 6, 30)
-
-    # Choose PEG or GAV
-    if peg and peg > 0:
-        V_driver = _neg(peg, 0.5, 3.0)
-    else:
-        GAV = (ev_ebitda / rev_g) if (ev_ebitda > 0 and rev_g and rev_g > 0) else None
-        V_driver = _neg(GAV, 0.4, 2.5) if GAV is not None else V_PE  # fallback to PE if no growth
 
-    valuation = 0.5 * V_PE + 0.3 * V_EV + 0.2 * V_driver
-
-    ##### safety
-
-    safety = (
-        _neg(debt_eq, 0.0, 1.0) +
-        _pos(curr_ratio, 1.0, 3.0)
-    ) / 2.0
-
-    # New subscores (using annuals)
-
-    stability = 0.5 if pd.isna(stability) else stability
-    moat      = 0.5 if pd.isna(moat) else moat
-    rd_score  = 0 if pd.isna(rd_intensity) else _pos(rd_intensity, 5, 22)
-    invest_sc = 0.5 if pd.isna(invest_ratio) else _neg(invest_ratio, 15, 60)
-    
-    score01 = (
-        importance_factors['growth']*growth +
-        importance_factors['profitability']*profitability +
-        importance_factors['valuation']*valuation +
-        importance_factors['safety']*safety +
-        importance_factors['stability']*stability +
-        importance_factors['moat']*moat +
-        importance_factors['rd_score']*rd_score +
-        importance_factors['invest_score']*invest_sc
-    )
-    score = round(100*score01, 1)
+def buy_score(info_dict, income_q, cashflow_q, balance_q, income_y, cashflow_y, importance_factors):
+    x = score_inputs(info_dict, income_q, cashflow_q, balance_q, income_y, cashflow_y)
+    X = np.array([[np.nan if v is None else float(v) for v in x.values()]])
+    subscores = pillar_matrix(X)[0]
+    score = round(float(score01(subscores, importance_factors)) * 100, 1)
 
     metric_vals = [
-        gm, om, roe, fpe, peg,
-        rev_g, fcf_margin, debt_eq, curr_ratio,
-        rd_intensity, invest_ratio,
-        growth, profitability, valuation, safety,
-        stability, moat, rd_score, invest_sc,
+        x['gm'], x['om'], x['roe'], x['fpe'], x['peg'],
+        x['rev_g'], x['fcf_margin'], x['debt_eq'], x['curr_ratio'],
+        x['rd_intensity'], x['invest_ratio'],
+        *[float(v) for v in subscores],
         score
     ]
     return score, metric_vals
@@ -128,17 +157,29 @@ def buy_score(info_dict, income_q, cashflow_q, balance_q, income_y, cashflow_y,
 
 
 
+TICKER_DF_COLUMNS = ["Company", "Ticker", "Growth Margin", "Operating Margin", "ROE", "Forward P/E", "PEG", "Revenue TTM Growth", "FCF Margin", "Debt/Equity", "Current Ratio", "R&D Intensity", "Investment Ratio", "Growth", "Profitability", "Valuation", "Safety", "Stability Score (Rev- Var)", "Moat Score (G.Margin- Var)", "R&D Score", "Investment Score", "Score"]
+
+
+def bundle_name(b):
+    return b['fund'].get('longName') or b['fund'].get('shortName') or b['fund'].get('symbol') or 'Unknown'
+
+
 def rank_stocks(bundles, importance_factors):
     """
     bundles: [{'fund': info_dict,
                'inc_q': incQ, 'cf_q': cfQ, 'bs_q': bsQ,
                'inc_y': incY, 'cf_y': cfY}, ...]
+    Bundles pruned to a fetch plan that drops a weighted pillar raise ValueError
+    (those pillars would silently score their missing-data defaults).
     """
     out = []
-    ticker_df = pd.DataFrame(columns=["Company", "Growth Margin", "Operating Margin", "ROE", "Forward P/E", "PEG", "Revenue TTM Growth", "FCF Margin", "Debt/Equity", "Current Ratio", "R&D Intensity", "Investment Ratio", "Growth", "Profitability", "Valuation", "Safety", "Stability Score (Rev- Var)", "Moat Score (G.Margin- Var)", "R&D Score", "Investment Score", "Score"])
+    ticker_df = pd.DataFrame(columns=TICKER_DF_COLUMNS)
     for b in bundles:
-        name = b['fund'].get('longName') or b['fund'].get('shortName') or b['fund'].get('symbol') or 'Unknown'
+        name = bundle_name(b)
+        missing = missing_pillars(b, importance_factors)
+        if missing:
+            raise ValueError(f'{name} was fetched without the rows for {missing}; refetch it for these weights')
         sc, metric_vals = buy_score(b['fund'], b['inc_q'], b['cf_q'], b['bs_q'], b['inc_y'], b['cf_y'], importance_factors)
-        ticker_df.loc[len(ticker_df)] = [name] + metric_vals
+        ticker_df.loc[len(ticker_df)] = [name, b['fund'].get('symbol')] + metric_vals
         out.append((name, sc, score_label(sc)))
     return sorted(out, key=lambda x: x[1], reverse=True), ticker_df
\ No newline at end of file
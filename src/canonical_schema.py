@@ -0,0 +1,253 @@
+import os
+
+import pandas as pd
+import numpy as np
+from finvizfinance.quote import Statements
+
+from src.screener_panel import load_data_sheet, CRORE
+
+
+# canonical metric -> (statement, yfinance row label)
+CANONICAL = {
+    'revenue':              ('inc', 'Total Revenue'),
+    'gross_profit':         ('inc', 'Gross Profit'),
+    'operating_income':     ('inc', 'Operating Income'),
+    'other_income':         ('inc', 'Other Non Operating Income Expenses'),
+    'interest_expense':     ('inc', 'Interest Expense'),
+    'depreciation':         ('inc', 'Reconciled Depreciation'),
+    'pretax_income':        ('inc', 'Pretax Income'),
+    'tax':                  ('inc', 'Tax Provision'),
+    'net_income':           ('inc', 'Net Income'),
+    'rnd':                  ('inc', 'Research And Development'),
+    'operating_cash_flow':  ('cf', 'Operating Cash Flow'),
+    'investing_cash_flow':  ('cf', 'Investing Cash Flow'),
+    'financing_cash_flow':  ('cf', 'Financing Cash Flow'),
+    'capex':                ('cf', 'Capital Expenditure'),
+    'free_cash_flow':       ('cf', 'Free Cash Flow'),
+    'total_debt':           ('bs', 'Total Debt'),
+    'cash':                 ('bs', 'Cash And Cash Equivalents'),
+    'receivables':          ('bs', 'Receivables'),
+    'inventory':            ('bs', 'Inventory'),
+    'current_assets':       ('bs', 'Current Assets'),
+    'current_liabilities':  ('bs', 'Current Liabilities'),
+    'equity':               ('bs', 'Stockholders Equity'),
+    'shares':               ('bs', 'Ordinary Shares Number'),
+}
+
+# source row label -> canonical metric
+LABEL_MAPS = {
+    'yfinance': {label: metric for metric, (_, label) in CANONICAL.items()},
+    'screener': {
+        'sales': 'revenue',
+        'other income': 'other_income',
+        'interest': 'interest_expense',
+        'depreciation': 'depreciation',
+        'profit before tax': 'pretax_income',
+        'tax': 'tax',
+        'net profit': 'net_income',
+        'borrowings': 'total_debt',
+        'cash & bank': 'cash',
+        'receivables': 'receivables',
+        'inventory': 'inventory',
+        'no. of equity shares': 'shares',
+        'cash from operating activity': 'operating_cash_flow',
+        'cash from investing activity': 'investing_cash_flow',
+        'cash from financing activity': 'financing_cash_flow',
+        'operating income': 'operating_income',     # derived in screener_to_canonical
+        'equity': 'equity',                         # derived in screener_to_canonical
+    },
+    'finviz': {
+        'Total Revenue': 'revenue',
+        'Gross Profit': 'gross_profit',
+        'Operating Income': 'operating_income',
+        'Interest Expense': 'interest_expense',
+        'Pretax Income': 'pretax_income',
+        'Income Tax': 'tax',
+        'Net Income': 'net_income',
+        'Research & Development': 'rnd',
+        'Cash from Operating Activities': 'operating_cash_flow',
+        'Cash from Investing Activities': 'investing_cash_flow',
+        'Cash from Financing Activities': 'financing_cash_flow',
+        'Capital Expenditures': 'capex',
+        'Free Cash Flow': 'free_cash_flow',
+        'Total Debt': 'total_debt',
+        'Cash & Equivalents': 'cash',
+        'Total Current Assets': 'current_assets',
+        'Total Current Liabilities': 'current_liabilities',
+        'Total Equity': 'equity',
+    },
+}
+
+# multiplier to plain currency units; metrics listed in UNSCALED are counts, not money
+SOURCE_UNITS = {'yfinance': 1.0, 'screener': CRORE, 'finviz': 1e6}
+UNSCALED = {'shares'}
+
+DEFAULT_PRECEDENCE = ['yfinance', 'screener', 'finviz']
+
+FREQS = ('Q', 'A')                          # canonical period frequencies: quarterly, annual
+BUNDLE_FREQS = {'_q': 'Q', '_y': 'A'}       # bundle key suffix -> freq
+
+LONG_COLUMNS = ['ticker', 'freq', 'period', 'metric', 'value', 'source']
+
+
+def to_canonical(df, source, ticker, freq):
+    """
+    One statement (rows = source labels, columns = period dates) -> long canonical rows
+    (LONG_COLUMNS). Unmapped labels are dropped; periods are snapped to month end.
+    freq must be one of FREQS.
+    """
+    if freq not in FREQS:
+        raise ValueError(f"freq must be one of {FREQS}, got {freq!r}")
+    if df is None or df.empty:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+    labels = LABEL_MAPS[source]
+    df = df.loc[df.index.isin(list(labels)), ~df.columns.duplicated(keep='last')]
+    long = df.apply(pd.to_numeric, errors='coerce').stack().dropna().rename('value').reset_index()
+    long.columns = ['label', 'period', 'value']
+    long['metric'] = long['label'].map(labels)
+    long['period'] = pd.to_datetime(long['period']) + pd.offsets.MonthEnd(0)
+    scale = np.where(long['metric'].isin(UNSCALED), 1.0, SOURCE_UNITS[source])
+    long['value'] = long['value'].astype(float) * scale
+    long['ticker'], long['freq'], long['source'] = ticker, freq, source
+    return long[LONG_COLUMNS]
+
+
+def bundle_to_canonical(bundle, ticker=None):
+    """All statements of a yfinance bundle as long canonical rows."""
+    ticker = ticker or bundle['fund'].get('symbol')
+    frames = [to_canonical(bundle.get(statement + suffix), 'yfinance', ticker, freq)
+              for suffix, freq in BUNDLE_FREQS.items() for statement in ('inc', 'cf', 'bs')]
+    return pd.concat(frames, ignore_index=True)
+
+
+def screener_to_canonical(sections, ticker):
+    """
+    Parsed Data Sheet sections (src.screener_panel.load_data_sheet) as long canonical rows.
+    Also derived: equity = share capital + reserves, and operating income = PBT + interest -
+    other income (screener's own 'operating profit' is before depreciation).
+    """
+    frames = []
+    for key, freq in (('pnl', 'A'), ('bs', 'A'), ('cf', 'A'), ('quarters', 'Q')):
+        df = sections.get(key)
+        if df is None:
+            continue
+        derived = {}
+        if {'profit before tax', 'interest'} <= set(df.index):
+            other = df.loc['other income'] if 'other income' in df.index else 0.0
+            derived['operating income'] = df.loc['profit before tax'] + df.loc['interest'] - other
+        if {'equity share capital', 'reserves'} <= set(df.index):
+            derived['equity'] = df.loc['equity share capital'] + df.loc['reserves']
+        if derived:
+            df = pd.concat([df, pd.DataFrame(derived).T])
+        frames.append(to_canonical(df, 'screener', ticker, freq))
+    return pd.concat(frames, ignore_index=True)
+
+
+def screener_folder_to_canonical(folder='portfolio_files_screener_in', tickers=None):
+    """
+    Every workbook in folder as long canonical rows. tickers maps workbook stem -> ticker
+    (e.g. {'Adani Power': 'ADANIPOWER.NS'}); unmapped workbooks keep their stem.
+    """
+    frames = []
+    for fname in sorted(os.listdir(folder)):
+        if not fname.endswith('.xlsx') or fname.startswith('~$'):
+            continue
+        stem = os.path.splitext(fname)[0]
+        try:
+            sections, _ = load_data_sheet(os.path.join(folder, fname))
+        except Exception as e:
+            print(f"Could not parse {fname}: {e}")
+            continue
+        frames.append(screener_to_canonical(sections, (tickers or {}).get(stem, stem)))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=LONG_COLUMNS)
+
+
+def fetch_finviz(ticker):
+    """Finviz annual + quarterly statements of one ticker as long canonical rows (one request per statement)."""
+    frames = []
+    for statement in ('I', 'B', 'C'):
+        for freq in ('A', 'Q'):
+            try:
+                df = Statements().get_statements(ticker, statement=statement, timeframe=freq)
+            except Exception as e:
+                print(f'error fetching finviz {statement}{freq} for {ticker}: {e}')
+                continue
+            if 'Period End Date' in df.index:
+                df.columns = pd.to_datetime(df.loc['Period End Date'], errors='coerce')
+                df = df.loc[:, df.columns.notna()].drop(index='Period End Date')
+            df = df.apply(lambda s: pd.to_numeric(s.astype(str).str.replace(',', ''), errors='coerce'))
+            frames.append(to_canonical(df, 'finviz', ticker, freq))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=LONG_COLUMNS)
+
+
+def merge_sources(frames, precedence=DEFAULT_PRECEDENCE, overrides=None):
+    """
+    Combine long canonical rows from any number of sources into one value per
+    (ticker, freq, period, metric): the first source in `precedence` that has a value
+    wins, later ones fill the gaps. overrides: {metric: [sources...]} for per-metric order.
+    Sources missing from an order rank last. Vectorized over the whole universe.
+    """
+    long = pd.concat(frames, ignore_index=True) if isinstance(frames, (list, tuple)) else frames
+    long = long.dropna(subset=['value'])
+    rank = {s: i for i, s in enumerate(precedence)}
+    order = long['source'].map(rank).fillna(len(rank))
+    for metric, sources in (overrides or {}).items():
+        hit = long['metric'] == metric
+        order[hit] = long.loc[hit, 'source'].map({s: i for i, s in enumerate(sources)}).fillna(len(rank))
+    key = ['ticker', 'freq', 'period', 'metric']
+    return (long.assign(_order=order.values)
+            .sort_values(key + ['_order'], kind='stable')
+            .drop_duplicates(key)
+            .drop(columns='_order')
+            .reset_index(drop=True))
+
+
+def to_statements(merged, ticker, freq='Q'):
+    """
+    {statement: DataFrame in yfinance labels, newest period first} for one ticker from merged
+    rows. Each statement keeps only the periods it has data for.
+    """
+    rows = merged[(merged['ticker'] == ticker) & (merged['freq'] == freq)]
+    wide = rows.pivot_table(index='metric', columns='period', values='value', aggfunc='first')
+    wide = wide.sort_index(axis=1, ascending=False)
+    out = {}
+    for statement in ('inc', 'cf', 'bs'):
+        metrics = [m for m, (s, _) in CANONICAL.items() if s == statement and m in wide.index]
+        out[statement] = wide.loc[metrics].dropna(axis=1, how='all').rename(index={m: CANONICAL[m][1] for m in metrics})
+        out[statement].columns.name = out[statement].index.name = None
+    return out
+
+
+def fill_bundles(bundles, merged):
+    """
+    Copies of yfinance bundles with their statements overlaid by merged canonical rows:
+    every cell merged has a value for takes that value, so merge_sources' precedence and
+    overrides apply to the bundle too (merge the bundles' own bundle_to_canonical rows in,
+    or the other sources replace them). Cells merged lacks keep the bundle's value, and
+    rows or periods the bundle lacks are added. Statement columns are snapped to month end
+    to line up with the other sources. A period is only added to a statement when the
+    merged rows have values for that statement.
+    """
+    by_ticker = dict(tuple(merged.groupby('ticker', sort=False)))
+    out = []
+    for b in bundles:
+        b = dict(b)
+        rows = by_ticker.get(b['fund'].get('symbol'))
+        if rows is None:
+            out.append(b)
+            continue
+        for suffix, freq in BUNDLE_FREQS.items():
+            for statement, extra in to_statements(rows, rows['ticker'].iloc[0], freq).items():
+                key, have = statement + suffix, b.get(statement + suffix)
+                if extra.empty:
+                    continue
+                if have is None or have.empty:
+                    b[key] = extra
+                    continue
+                have_m = have.copy()
+                have_m.columns = pd.DatetimeIndex(have_m.columns) + pd.offsets.MonthEnd(0)
+                combined = extra.combine_first(have_m)
+                combined = combined.reindex(columns=combined.columns.sort_values(ascending=False))
+                b[key] = combined.reindex(list(have.index) + [r for r in combined.index if r not in have.index])
+        out.append(b)
+    return out
@@ -0,0 +1,276 @@
+import os
+import json
+import hashlib
+import datetime as dt
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+import matplotlib.dates as mdates
+
+from src.vector_scoring import inputs_matrix, pillar_matrix, composite_scores, PILLARS
+from src.batch_runner import _safe_name, load_rankings
+
+
+RENDER_VERSION = 2          # bump when the panel layout changes to re-render everything
+MANIFEST_FILE = 'manifest.json'
+N_QUARTERS = 5              # revenue / margin slots per panel (yfinance supplies about 5 quarters)
+TICKERS_PER_TASK = 25
+DPI = 100
+
+
+# ---------- chart data (computed in the parent; small, picklable, hashable) ----------
+
+def _row(df, label, n):
+    if df is None or label not in df.index:
+        return [np.nan] * n
+    vals = pd.to_numeric(df.loc[label].iloc[:n], errors='coerce').astype(float).tolist()
+    return vals + [np.nan] * (n - len(vals))
+
+
+def _margin(inc, label, ready, n):
+    """Margin row in % from label / Total Revenue, or the ready-made margin row if the statement has one."""
+    if inc is not None and ready in inc.index:
+        return [v * 100 if abs(v) <= 1.5 else v for v in _row(inc, ready, n)]
+    num, rev = np.array(_row(inc, label, n)), np.array(_row(inc, 'Total Revenue', n))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rev > 0, num / rev * 100, np.nan).tolist()
+
+
+def _period_labels(inc, n):
+    if inc is None or inc.shape[1] == 0:
+        return [''] * n
+    labels = [c.strftime('%y-%m') if hasattr(c, 'strftime') else str(c) for c in inc.columns[:n]]
+    return labels + [''] * (n - len(labels))
+
+
+def chart_data(bundles, importance_factors, score_history=None):
+    """
+    Everything a panel draws, per ticker: {ticker: dict of plain lists/floats}.
+    Oldest-first series. score_history: optional DataFrame (dates x tickers) of past scores.
+    """
+    X, names = inputs_matrix(bundles)
+    P = pillar_matrix(X)
+    scores = composite_scores(P, importance_factors)
+    out = {}
+    for i, b in enumerate(bundles):
+        t = names['Ticker'].iloc[i]
+        inc = b.get('inc_q')
+        hist = []
+        if score_history is not None and t in score_history.columns:
+            s = score_history[t].dropna()
+            hist = [[str(d.date()) if hasattr(d, 'date') else str(d), float(v)] for d, v in s.items()]
+        out[t] = {
+            'ticker': t,
+            'company': names['Company'].iloc[i],
+            'periods': _period_labels(inc, N_QUARTERS)[::-1],
+            'revenue': _row(inc, 'Total Revenue', N_QUARTERS)[::-1],
+            'gross_margin': _margin(inc, 'Gross Profit', 'Gross Margin', N_QUARTERS)[::-1],
+            'operating_margin': _margin(inc, 'Operating Income', 'Operating Margin', N_QUARTERS)[::-1],
+            'pillars': [float(v) for v in P[i]],
+            'weights': [float(importance_factors[p]) for p in PILLARS],
+            'score': float(scores[i]),
+            'score_history': hist,
+        }
+    return out
+
+
+def input_hash(data):
+    blob = json.dumps([RENDER_VERSION, data], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def score_history_from_runs(run_dirs):
+    """{date: run_dir} of src.batch_runner runs scored with importance_factors -> DataFrame dates x tickers."""
+    cols = {}
+    for date, run_dir in run_dirs.items():
+        _, df = load_rankings(run_dir)
+        cols[pd.Timestamp(date)] = df.set_index('Ticker')['Score'].astype(float)
+    return pd.DataFrame(cols).T.sort_index()
+
+
+# ---------- worker side: one template figure per process, artists updated in place ----------
+
+_TEMPLATE = None
+
+
+def _init_worker():
+    global _TEMPLATE
+    _TEMPLATE = _build_template()
+
+
+def _build_template():
+    # a bare Figure on an Agg canvas: no pyplot, so the caller's backend and figure list are untouched
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(12, 7), dpi=DPI)
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(2, 2)
+    ax_rev, ax_mar, ax_pil, ax_hist = axes.ravel()
+    x = np.arange(N_QUARTERS)
+
+    rev_bars = ax_rev.bar(x, np.zeros(N_QUARTERS), color='#4c72b0')
+    ax_rev.set_title('Quarterly revenue')
+    ax_rev.set_xticks(x)
+
+    gm_line, = ax_mar.plot(x, np.zeros(N_QUARTERS), marker='o', label='Gross margin %')
+    om_line, = ax_mar.plot(x, np.zeros(N_QUARTERS), marker='o', label='Operating margin %')
+    ax_mar.set_title('Margins')
+    ax_mar.set_xticks(x)
+    ax_mar.legend(loc='lower left', fontsize=8)
+    ax_mar.grid(alpha=0.3)
+
+    y = np.arange(len(PILLARS))
+    pil_bars = ax_pil.barh(y, np.zeros(len(PILLARS)), color='#55a868')
+    ax_pil.set_yticks(y)
+    ax_pil.set_yticklabels(PILLARS)
+    ax_pil.invert_yaxis()
+    ax_pil.set_xlim(0, 1)
+    ax_pil.set_title('Pillar subscores (0..1)')
+    pil_text = [ax_pil.text(1.0, yi, '', va='center', ha='right', fontsize=8) for yi in y]
+
+    hist_line, = ax_hist.plot([], [], marker='o', color='#c44e52')
+    locator = mdates.AutoDateLocator(minticks=3, maxticks=6)
+    ax_hist.xaxis.set_major_locator(locator)
+    ax_hist.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    ax_hist.set_ylim(0, 100)
+    ax_hist.set_title('Buy Score history')
+    ax_hist.grid(alpha=0.3)
+    hist_text = ax_hist.text(0.5, 0.5, '', transform=ax_hist.transAxes, ha='center', va='center')
+
+    title = fig.suptitle('')
+    # fixed margins rather than tight_layout: a layout engine on the figure costs an extra draw per savefig
+    fig.subplots_adjust(left=0.11, right=0.98, bottom=0.06, top=0.90, hspace=0.3, wspace=0.25)
+    return {'fig': fig, 'title': title, 'ax_rev': ax_rev, 'rev_bars': rev_bars, 'ax_mar': ax_mar,
+            'gm_line': gm_line, 'om_line': om_line, 'pil_bars': pil_bars, 'pil_text': pil_text,
+            'ax_hist': ax_hist, 'hist_line': hist_line, 'hist_text': hist_text}
+
+
+def _draw(data, path):
+    T = _TEMPLATE
+    T['title'].set_text(f"{data['company']} ({data['ticker']}) - Buy Score {data['score']:.1f}")
+
+    # series are right-aligned (oldest first, padded at the front): show only the filled slots
+    n = max(sum(1 for p in data['periods'] if p), 1)
+    xlim = (N_QUARTERS - n - 0.5, N_QUARTERS - 0.5)
+
+    rev = np.nan_to_num(np.array(data['revenue'], dtype=float))
+    for bar, h in zip(T['rev_bars'], rev):
+        bar.set_height(h)
+    T['ax_rev'].set_ylim(min(0.0, rev.min()) * 1.1, max(rev.max() * 1.1, 1e-9))
+    T['ax_rev'].set_xlim(*xlim)
+    T['ax_rev'].set_xticklabels(data['periods'], fontsize=8)
+
+    gm, om = np.array(data['gross_margin'], dtype=float), np.array(data['operating_margin'], dtype=float)
+    T['gm_line'].set_ydata(gm)
+    T['om_line'].set_ydata(om)
+    both = np.concatenate([gm, om])
+    lo, hi = (np.nanmin(both), np.nanmax(both)) if np.isfinite(both).any() else (0.0, 1.0)
+    pad = max(2.0, 0.1 * (hi - lo))
+    T['ax_mar'].set_ylim(lo - pad, hi + pad)
+    T['ax_mar'].set_xlim(*xlim)
+    T['ax_mar'].set_xticklabels(data['periods'], fontsize=8)
+
+    for bar, txt, v, w in zip(T['pil_bars'], T['pil_text'], data['pillars'], data['weights']):
+        bar.set_width(v)
+        txt.set_text(f'w={w:g}')
+
+    hist = data['score_history']
+    T['ax_hist'].xaxis.set_visible(bool(hist))
+    if hist:
+        x = pd.to_datetime([d for d, _ in hist])
+        T['hist_line'].set_data(mdates.date2num(x), [v for _, v in hist])
+        T['ax_hist'].set_xlim(mdates.date2num(x.min() - pd.Timedelta(days=15)),
+                              mdates.date2num(x.max() + pd.Timedelta(days=15)))
+        T['hist_text'].set_text('')
+    else:
+        T['hist_line'].set_data([], [])
+        T['hist_text'].set_text('no score history')
+
+    tmp = path + '.tmp.png'
+    T['fig'].savefig(tmp, dpi=DPI, pil_kwargs={'compress_level': 1})
+    os.replace(tmp, path)
+
+
+def _render_chunk(items):
+    done = []
+    for data, path in items:
+        try:
+            _draw(data, path)
+            done.append((data['ticker'], None))
+        except Exception as e:
+            done.append((data['ticker'], f'{type(e).__name__}: {e}'))
+    return done
+
+
+# ---------- driver ----------
+
+def _read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _run_chunks(chunks, workers):
+    global _TEMPLATE
+    if workers == 1 or len(chunks) == 1:
+        # serial, in the caller's process: use a private template and drop it afterwards
+        prev, _TEMPLATE = _TEMPLATE, _build_template()
+        try:
+            yield from map(_render_chunk, chunks)
+        finally:
+            _TEMPLATE['fig'].clear()
+            _TEMPLATE = prev
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        yield from pool.map(_render_chunk, chunks)
+
+
+def render_charts(bundles, importance_factors, out_dir, score_history=None, workers=None, force=False):
+    """
+    One PNG panel per ticker in out_dir (revenue, margins, pillar subscores, score history),
+    rendered headless across a process pool. A ticker is skipped when its chart inputs hash
+    to the value recorded in out_dir/manifest.json and its image still exists.
+    Returns {'rendered': [...], 'skipped': [...], 'errors': {ticker: msg}}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _read_manifest(out_dir)
+    todo, skipped = [], []
+    for t, data in chart_data(bundles, importance_factors, score_history).items():
+        h = input_hash(data)
+        fname = _safe_name(t) + '.png'
+        prev = manifest.get(t, {})
+        if not force and prev.get('hash') == h and os.path.exists(os.path.join(out_dir, fname)):
+            skipped.append(t)
+            continue
+        todo.append((data, os.path.join(out_dir, fname), h, fname))
+
+    rendered, errors = [], {}
+    if not todo:
+        return {'rendered': rendered, 'skipped': skipped, 'errors': errors}
+    chunks = [[(d, p) for d, p, _, _ in todo[i:i + TICKERS_PER_TASK]]
+              for i in range(0, len(todo), TICKERS_PER_TASK)]
+    meta = {d['ticker']: (h, fname) for d, _, h, fname in todo}
+    now = dt.datetime.now().isoformat(timespec='seconds')
+    try:
+        for chunk in _run_chunks(chunks, workers):
+            for t, err in chunk:
+                if err:
+                    errors[t] = err
+                    print(f'error rendering {t}: {err}')
+                    continue
+                h, fname = meta[t]
+                manifest[t] = {'hash': h, 'file': fname, 'rendered_at': now}
+                rendered.append(t)
+    finally:
+        _write_manifest(out_dir, manifest)   # keep what finished even if the run is interrupted
+    return {'rendered': rendered, 'skipped': skipped, 'errors': errors}
@@ -0,0 +1,73 @@
+import pandas as pd
+import numpy as np
+from scipy.cluster.hierarchy import linkage, fcluster
+
+from src.portfolio import daily_returns, TRADING_DAYS, MIN_HISTORY
+
+
+MAX_CORR_DISTANCE = 0.5   # 1 - rho; tickers closer than this (rho > 0.5) end up in one cluster
+LINKAGE_METHOD = 'average'
+
+
+def correlation_matrix(returns):
+    """Pearson correlation of every column pair in one matrix product (returns: dates x tickers)."""
+    X = np.asarray(returns, dtype=float)
+    X = X - X.mean(axis=0)
+    sd = np.sqrt((X ** 2).sum(axis=0))
+    sd[sd == 0] = np.inf                 # flat series correlate 0 with everything
+    Z = X / sd
+    corr = Z.T @ Z
+    np.fill_diagonal(corr, 1.0)
+    return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=returns.columns, columns=returns.columns)
+
+
+def cluster_tickers(corr, max_distance=MAX_CORR_DISTANCE, method=LINKAGE_METHOD):
+    """
+    Hierarchical clustering on the distance 1 - rho, cut at max_distance.
+    Returns a Series ticker -> cluster id (1..k, numbered by cluster size, largest first).
+    """
+    n = len(corr)
+    if n == 0:
+        return pd.Series(dtype=int, name='Cluster')
+    if n == 1:
+        return pd.Series([1], index=corr.index, name='Cluster')
+    dist = 1.0 - corr.values
+    condensed = dist[np.triu_indices(n, k=1)]          # scipy's condensed (upper-triangle) form
+    labels = fcluster(linkage(condensed, method=method), t=max_distance, criterion='distance')
+    codes, sizes = np.unique(labels, return_counts=True)
+    renumber = np.empty(codes.max() + 1, dtype=int)
+    renumber[codes[np.argsort(-sizes, kind='stable')]] = np.arange(1, len(codes) + 1)
+    return pd.Series(renumber[labels], index=corr.index, name='Cluster')
+
+
+def annotate_clusters(ticker_df, prices, max_distance=MAX_CORR_DISTANCE, method=LINKAGE_METHOD,
+                      lookback_days=TRADING_DAYS, min_history=MIN_HISTORY):
+    """
+    Copy of ticker_df (needs a 'Ticker' column) with 'Cluster' and 'Cluster Size' columns,
+    from the daily-return correlations over the last lookback_days of prices. Tickers without
+    enough price history get no cluster (<NA>). Also returns the correlation matrix.
+    """
+    rets = daily_returns(prices, ticker_df['Ticker'].dropna().unique(), lookback_days, min_history)
+    corr = correlation_matrix(rets)
+    clusters = cluster_tickers(corr, max_distance, method)
+    out = ticker_df.copy()
+    out['Cluster'] = out['Ticker'].map(clusters).astype('Int64')
+    out['Cluster Size'] = out['Cluster'].map(clusters.value_counts()).astype('Int64')
+    return out, corr
+
+
+def diversified_top(ticker_df, k=10, per_cluster=1):
+    """
+    Best-scoring k rows taking at most per_cluster names from each cluster
+    (rows without a cluster count as their own). Needs the columns added by annotate_clusters.
+    """
+    df = ticker_df.sort_values('Score', ascending=False, kind='stable')
+    key = df['Cluster'].astype('float').fillna(pd.Series(-np.arange(1, len(df) + 1), index=df.index))
+    return df[df.groupby(key).cumcount() < per_cluster].head(k)
+
+
+def concentration_report(ticker_df, top_n=20):
+    """Clusters represented more than once among the top_n scorers, with their tickers."""
+    top = ticker_df.sort_values('Score', ascending=False, kind='stable').head(top_n).dropna(subset=['Cluster'])
+    groups = top.groupby('Cluster')['Ticker'].agg(['count', list]).rename(columns={'list': 'tickers'})
+    return groups[groups['count'] > 1].sort_values('count', ascending=False)
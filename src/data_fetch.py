@@ -0,0 +1,38 @@
+import pandas as pd
+import yfinance as yf
+
+
+# bundle key -> yfinance Ticker attribute
+STATEMENT_ATTRS = {
+    'inc_q': 'quarterly_incomestmt',
+    'cf_q': 'quarterly_cashflow',
+    'bs_q': 'quarterly_balance_sheet',
+    'inc_y': 'incomestmt',
+    'cf_y': 'cashflow',
+    'bs_y': 'balancesheet',
+}
+
+
+def fetch_bundle(ticker, plan=None):
+    """
+    Pull one ticker from yfinance into the bundle shape rank_stocks expects:
+    {'fund': info_dict, 'inc_q': ..., 'cf_q': ..., 'bs_q': ..., 'inc_y': ..., 'cf_y': ..., 'bs_y': ...}
+
+    plan: optional {bundle_key: row labels} from src.fetch_planner.plan_fetch. Statements
+    outside the plan are not requested (yfinance loads them lazily) and come back empty;
+    planned ones are pruned to the planned rows. The plan is kept in bundle['plan'] so
+    scoring can tell which pillars the bundle can support.
+    """
+    stock = yf.Ticker(ticker)
+    bundle = {'fund': stock.info}
+    for key, attr in STATEMENT_ATTRS.items():
+        if plan is None:
+            bundle[key] = getattr(stock, attr)
+        elif key in plan:
+            df = getattr(stock, attr)
+            bundle[key] = df.loc[df.index.intersection(plan[key], sort=False)]
+        else:
+            bundle[key] = pd.DataFrame()
+    if plan is not None:
+        bundle['plan'] = plan
+    return bundle
@@ -0,0 +1,71 @@
+import os
+import pickle
+
+import pandas as pd
+
+from src.buy_logic import PILLAR_REQUIREMENTS
+from src.data_fetch import STATEMENT_ATTRS
+from src.batch_runner import read_journal
+from src.helper_functions import _atomic_pickle
+
+
+def plan_fetch(importance_factors):
+    """
+    Minimal {bundle_key: [row labels]} the scorer reads for these weights.
+    Pillars with weight 0 contribute nothing, so their statements/rows are dropped
+    (e.g. no R&D rows when rd_score is 0, no cash-flow annuals when invest_score is 0).
+    Their columns in ticker_df then show the missing-data defaults.
+    """
+    plan = {}
+    for pillar, reqs in PILLAR_REQUIREMENTS.items():
+        if not importance_factors.get(pillar, 0):
+            continue
+        for key, labels in reqs.items():
+            plan.setdefault(key, [])
+            plan[key] += [lbl for lbl in labels if lbl not in plan[key]]
+    return plan
+
+
+def describe_plan(plan):
+    rows = []
+    for key in STATEMENT_ATTRS:
+        labels = plan.get(key, [])
+        rows.append({'statement': key, 'fetched': key in plan, 'rows': len(labels), 'labels': ', '.join(labels)})
+    return pd.DataFrame(rows)
+
+
+def prune_bundle(bundle, plan):
+    """
+    Copy of bundle keeping only planned statements/rows ('fund' is kept whole). The plan
+    actually applied (narrowed by any plan the bundle already had) is kept in out['plan'].
+    """
+    prev = bundle.get('plan')
+    if prev is not None:
+        plan = {k: [lbl for lbl in labels if lbl in prev[k]] for k, labels in plan.items() if k in prev}
+    out = {'fund': bundle['fund'], 'plan': plan}
+    for key in STATEMENT_ATTRS:
+        df = bundle.get(key)
+        if key in plan and df is not None:
+            out[key] = df.loc[df.index.intersection(plan[key], sort=False)]
+        else:
+            out[key] = pd.DataFrame()
+    return out
+
+
+def prune_cached_bundles(run_dir, plan):
+    """
+    Rewrite the pickled bundles of a src.batch_runner run in place, pruned to plan (recorded
+    in each bundle, so scoring them with weights the plan does not cover raises).
+    Returns (bytes_before, bytes_after).
+    """
+    before = after = 0
+    for t, s in read_journal(run_dir).items():
+        if s['status'] != 'done':
+            continue
+        path = os.path.join(run_dir, s['bundle'])
+        before += os.path.getsize(path)
+        with open(path, 'rb') as f:
+            bundle = pickle.load(f)
+        _atomic_pickle(prune_bundle(bundle, plan), path)
+        after += os.path.getsize(path)
+    return before, after
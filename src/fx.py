@@ -0,0 +1,165 @@
+import os
+
+import pandas as pd
+import numpy as np
+import yfinance as yf
+
+from src.data_fetch import STATEMENT_ATTRS
+
+
+FX_CACHE = 'fx_rates.csv'    # long table: date, currency, per_usd (units of currency per 1 USD)
+
+# statement rows that are not money (ratios, share counts) and must not be converted
+NON_MONETARY_ROWS = {
+    'Operating Margin', 'Gross Margin', 'Tax Rate For Calcs', 'Basic Average Shares', 'Diluted Average Shares',
+    'Ordinary Shares Number', 'Share Issued', 'Treasury Shares Number', 'Preferred Shares Number',
+}
+
+# info fields quoted in the trading currency vs the reporting (financial) currency
+INFO_TRADING_FIELDS = ['currentPrice', 'previousClose', 'open', 'dayLow', 'dayHigh', 'fiftyTwoWeekLow',
+                       'fiftyTwoWeekHigh', 'fiftyDayAverage', 'twoHundredDayAverage', 'marketCap',
+                       'enterpriseValue', 'targetMeanPrice', 'targetHighPrice', 'targetLowPrice']
+INFO_FINANCIAL_FIELDS = ['totalRevenue', 'grossProfits', 'ebitda', 'netIncomeToCommon', 'freeCashflow',
+                         'operatingCashflow', 'totalCash', 'totalDebt', 'totalCashPerShare', 'revenuePerShare',
+                         'bookValue', 'trailingEps', 'forwardEps']
+
+
+def download_rates(currencies, path=FX_CACHE, start='2015-01-01'):
+    """Fetch daily <CUR>=X closes (units per USD) from yfinance into the local rate table, merged with what is there."""
+    frames = []
+    for cur in sorted(set(currencies) - {'USD', None}):
+        try:
+            close = yf.Ticker(f'{cur}=X').history(start=start)['Close']
+        except Exception as e:
+            print(f'error fetching FX rate for {cur}: {e}')
+            continue
+        frames.append(pd.DataFrame({'date': close.index.tz_localize(None).normalize(),
+                                    'currency': cur, 'per_usd': close.values}))
+    if os.path.exists(path):
+        frames.insert(0, pd.read_csv(path, parse_dates=['date']))
+    table = (pd.concat(frames, ignore_index=True)
+             .drop_duplicates(['date', 'currency'], keep='last').sort_values(['currency', 'date']))
+    table.to_csv(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    return table
+
+
+class FxTable:
+    """
+    Date-aware FX lookups from a local rate table. A rate for a date is the latest
+    one on or before it (as-of); factors are memoized per (currency, date).
+    """
+
+    def __init__(self, rates=FX_CACHE):
+        table = pd.read_csv(rates, parse_dates=['date']) if isinstance(rates, str) else rates
+        wide = table.pivot_table(index='date', columns='currency', values='per_usd').sort_index()
+        self.dates = wide.index.values.astype('datetime64[ns]')
+        self.rates = {c: wide[c].ffill().values for c in wide.columns}
+        self.rates['USD'] = np.ones(len(wide))
+        self.cache = {}
+
+    def per_usd(self, currency, dates):
+        """Units of currency per USD as of each date (array); memoized per (currency, date)."""
+        dates = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+        missing = [d for d in dict.fromkeys(dates) if (currency, d) not in self.cache]
+        if missing:
+            if currency not in self.rates:
+                raise KeyError(f'no FX rates for {currency} in the rate table')
+            pos = np.searchsorted(self.dates, pd.DatetimeIndex(missing).values, side='right') - 1
+            vals = np.where(pos >= 0, self.rates[currency][np.maximum(pos, 0)], np.nan)
+            self.cache.update(zip(((currency, d) for d in missing), vals))
+        return np.array([self.cache[(currency, d)] for d in dates], dtype=float)
+
+    def factors(self, src, dst, dates):
+        """Multipliers taking amounts in src to dst at each date."""
+        if src == dst:
+            return np.ones(len(dates))
+        return self.per_usd(dst, dates) / self.per_usd(src, dates)
+
+
+def currency_table(bundles):
+    """Ticker, trading and reporting currency per bundle; 'mismatch' flags ADR-style listings."""
+    rows = [{'Ticker': b['fund'].get('symbol'),
+             'currency': b['fund'].get('currency'),
+             'financialCurrency': b['fund'].get('financialCurrency') or b['fund'].get('currency')}
+            for b in bundles]
+    df = pd.DataFrame(rows, columns=['Ticker', 'currency', 'financialCurrency'])
+    df['mismatch'] = df['currency'] != df['financialCurrency']
+    return df
+
+
+def _values(df):
+    try:
+        return df.to_numpy(dtype=float, na_value=np.nan)
+    except (TypeError, ValueError):
+        return df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def _convert_group(frames, factor_of):
+    """
+    Convert same-currency statements with one multiply: all cells are flattened into one
+    vector, scaled by the factor of their column's period (1 for non-monetary rows), and
+    split back into frames.
+    """
+    arrays = [_values(df) for df in frames]
+    periods = pd.DatetimeIndex(np.concatenate([df.columns.values for df in frames]))
+    uniq, inv = np.unique(periods.normalize().values, return_inverse=True)
+    col_factor = factor_of(uniq)[inv]                     # one entry per column, across all frames
+
+    col_offsets = np.cumsum([0] + [a.shape[1] for a in arrays])
+    cell_col = np.concatenate([off + np.tile(np.arange(a.shape[1]), a.shape[0])
+                               for off, a in zip(col_offsets, arrays)])
+    cell_money = np.concatenate([np.repeat(~df.index.isin(NON_MONETARY_ROWS), df.shape[1]) for df in frames])
+    flat = np.concatenate([a.ravel() for a in arrays])
+    flat = flat * np.where(cell_money, col_factor[cell_col], 1.0)
+
+    pieces = np.split(flat, np.cumsum([a.size for a in arrays])[:-1])
+    return [pd.DataFrame(v.reshape(a.shape), index=df.index, columns=df.columns)
+            for v, a, df in zip(pieces, arrays, frames)]
+
+
+def convert_bundles(bundles, fx, target='USD', as_of=None, dated=True):
+    """
+    Copies of bundles with every monetary amount in `target`. Info price fields (trading
+    currency) and info fundamentals (reporting currency) use the as_of rate (default: the
+    latest in the table). Statements use each period end's as-of rate when dated=True,
+    so growth rates include currency moves; dated=False applies the as_of rate throughout,
+    which keeps every statement ratio and growth rate (and so the Buy Score) unchanged.
+    Ratios such as margins, P/E or EV/EBITDA are left as they are.
+    """
+    as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp(fx.dates[-1])
+    table = currency_table(bundles)
+    known = table[['financialCurrency', 'currency']].isin(set(fx.rates) | {target}).all(axis=1)
+    for t in table.loc[~known, 'Ticker']:
+        print(f'no FX rates for {t}\'s currencies, left unconverted')
+    spot = {c: fx.factors(c, target, [as_of])[0]
+            for c in pd.unique(table.loc[known, ['financialCurrency', 'currency']].values.ravel())}
+    out = [dict(b) for b in bundles]
+
+    for cur, idx in table[known].groupby('financialCurrency').groups.items():
+        if cur == target:
+            continue
+        if dated:
+            factor_of = lambda d, cur=cur: fx.factors(cur, target, d)
+        else:
+            factor_of = lambda d, cur=cur: np.full(len(d), spot[cur])
+        for key in STATEMENT_ATTRS:
+            members = [i for i in idx if out[i].get(key) is not None and not out[i][key].empty]
+            if not members:
+                continue
+            for i, df in zip(members, _convert_group([out[i][key] for i in members], factor_of)):
+                out[i][key] = df
+
+    for i in np.flatnonzero(known.values):
+        info = dict(out[i]['fund'])
+        fin, trade = table.loc[i, 'financialCurrency'], table.loc[i, 'currency']
+        for fields, cur in ((INFO_FINANCIAL_FIELDS, fin), (INFO_TRADING_FIELDS, trade)):
+            if cur == target:
+                continue
+            for k in fields:
+                if isinstance(info.get(k), (int, float)):
+                    info[k] = info[k] * spot[cur]
+        info['reportedCurrency'], info['tradedCurrency'] = fin, trade
+        info['financialCurrency'] = info['currency'] = target
+        out[i]['fund'] = info
+    return out
@@ -1,3 +1,6 @@
+import os
+import pickle
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -6,6 +9,16 @@ import datetime as dt
 import math
 
 
+def _atomic_pickle(obj, path):
+    """Pickle obj to path via a fsynced temp file, so readers never see a partial file."""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
 def _to_float(x, default=0.0):
     if x is None:
         return default
@@ -0,0 +1,256 @@
+import pandas as pd
+import numpy as np
+
+
+TRADING_DAYS = 252
+MIN_HISTORY = 0.8      # fraction of the lookback a ticker needs to have prices for
+FISTA_ITERS = 400
+BISECT_ITERS = 60
+SHARPE_ITERS = 30
+
+
+def load_price_history(path):
+    """
+    Local price history -> wide DataFrame (date index, one close column per ticker).
+    Accepts a wide CSV/parquet (first column = date) or a long one with date/ticker/close columns.
+    """
+    df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+    cols = {c.lower(): c for c in df.columns}
+    if {'date', 'ticker'} <= set(cols):
+        value = cols.get('adj close') or cols.get('close')
+        df = df.pivot_table(index=cols['date'], columns=cols['ticker'], values=value)
+    else:
+        df = df.set_index(df.columns[0])
+    df.index = pd.to_datetime(df.index)
+    return df.sort_index()
+
+
+def daily_returns(prices, tickers=None, lookback_days=None, min_history=MIN_HISTORY):
+    """Simple daily returns; tickers with too little history are dropped, remaining gaps count as 0."""
+    if tickers is not None:
+        prices = prices.reindex(columns=[t for t in tickers if t in prices.columns])
+    if lookback_days:
+        prices = prices.iloc[-(lookback_days + 1):]
+    rets = prices.pct_change(fill_method=None).iloc[1:]
+    rets = rets.loc[:, rets.notna().mean() >= min_history]
+    return rets.fillna(0.0)
+
+
+def ledoit_wolf(returns):
+    """
+    Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity
+    (same estimator as sklearn.covariance.ledoit_wolf). Returns (cov, shrinkage).
+    """
+    X = np.asarray(returns, dtype=float)
+    X = X - X.mean(axis=0)
+    n, p = X.shape
+    X2 = X ** 2
+    emp_cov_trace = X2.sum(axis=0) / n
+    mu = emp_cov_trace.sum() / p
+    emp_cov = X.T @ X / n
+
+    beta_ = (X2.T @ X2).sum()
+    delta_ = (emp_cov ** 2).sum()
+    beta = (beta_ / n - delta_) / (p * n)
+    delta = (delta_ - 2.0 * mu * emp_cov_trace.sum() + p * mu ** 2) / p
+    beta = min(beta, delta)
+    shrinkage = 0.0 if beta == 0 else beta / delta
+
+    cov = (1.0 - shrinkage) * emp_cov
+    cov.flat[::p + 1] += shrinkage * mu
+    return cov, shrinkage
+
+
+# ---------- projection onto {sum w = 1, 0 <= w <= cap, sector sums <= sector cap} ----------
+
+def _project_capped_simplex(y, cap):
+    """
+    Exact Euclidean projection onto {sum w = 1, 0 <= w <= cap}: w = clip(y - lam, 0, cap),
+    with lam found from the breakpoints of the piecewise-linear sum (sort + cumsum, no loop).
+    """
+    ys = np.sort(y)
+    suffix = np.concatenate([np.cumsum(ys[::-1])[::-1], [0.0]])   # suffix[k] = sum(ys[k:])
+    n = len(ys)
+
+    def total(lam):
+        # sum clip(y - lam, 0, cap) = g(lam) - g(lam + cap), g(l) = sum max(y - l, 0)
+        k1 = np.searchsorted(ys, lam, side='right')
+        k2 = np.searchsorted(ys, lam + cap, side='right')
+        return (suffix[k1] - lam * (n - k1)) - (suffix[k2] - (lam + cap) * (n - k2))
+
+    bps = np.sort(np.concatenate([y - cap, y]))
+    f = total(bps)                                   # non-increasing in lam
+    j = np.searchsorted(-f, -1.0, side='left')       # first breakpoint with f <= 1
+    if j == 0:
+        lam = bps[0]
+    else:
+        lo, hi, flo, fhi = bps[j-1], bps[j], f[j-1], f[j]
+        lam = hi if flo == fhi else lo + (flo - 1.0) * (hi - lo) / (flo - fhi)
+    return np.clip(y - lam, 0.0, cap)
+
+
+def _project(y, cap, groups=None, group_caps=None):
+    """
+    Euclidean projection onto {sum w = 1, 0 <= w <= cap, sum_{i in g} w_i <= cap_g}.
+    KKT gives w = clip(y - lam - mu_g, 0, cap), where mu_g >= 0 is the smallest shift that
+    brings group g under its cap, so the budget is sum_g min(group_sum_g(lam), cap_g) = 1:
+    bisect lam on that, then bisect all mu_g at once.
+    """
+    if groups is None:
+        return _project_capped_simplex(y, cap)
+    ng = len(group_caps)
+
+    def group_sums(shift):
+        return np.bincount(groups, weights=np.clip(y - shift, 0.0, cap), minlength=ng)
+
+    lo, hi = (y - cap).min() - 1.0, y.max()
+    for _ in range(BISECT_ITERS):
+        lam = 0.5 * (lo + hi)
+        if np.minimum(group_sums(lam), group_caps).sum() > 1.0:
+            lo = lam
+        else:
+            hi = lam
+    lam = hi
+
+    over = group_sums(lam) > group_caps
+    if not over.any():
+        return np.clip(y - lam, 0.0, cap)
+    mu_lo, mu_hi = np.zeros(ng), np.full(ng, y.max() - lam + 1.0)
+    for _ in range(BISECT_ITERS):
+        mid = 0.5 * (mu_lo + mu_hi)
+        too_big = group_sums(lam + mid[groups]) > group_caps
+        mu_lo = np.where(too_big, mid, mu_lo)
+        mu_hi = np.where(too_big, mu_hi, mid)
+    mu = np.where(over, mu_hi, 0.0)
+    return np.clip(y - lam - mu[groups], 0.0, cap)
+
+
+def _max_eigenvalue(cov, iters=100):
+    v = np.ones(len(cov)) / np.sqrt(len(cov))
+    lam = 0.0
+    for _ in range(iters):
+        u = cov @ v
+        lam_new = np.linalg.norm(u)
+        v = u / lam_new
+        if abs(lam_new - lam) < 1e-6 * lam_new:
+            break
+        lam = lam_new
+    return 1.01 * lam_new     # small margin: power iteration approaches from below
+
+
+def _solve_qp(cov, linear, cap, groups=None, group_caps=None, w0=None, L=None):
+    """min w'Σw - linear'w over the constraint set, by accelerated projected gradient (FISTA)."""
+    n = len(linear)
+    L = 2.0 * _max_eigenvalue(cov) if L is None else L
+    w = np.full(n, 1.0 / n) if w0 is None else w0
+    w = _project(w, cap, groups, group_caps)
+    z, t = w.copy(), 1.0
+    for _ in range(FISTA_ITERS):
+        grad = 2.0 * cov @ z - linear
+        w_next = _project(z - grad / L, cap, groups, group_caps)
+        t_next = 0.5 * (1 + np.sqrt(1 + 4 * t * t))
+        z = w_next + ((t - 1) / t_next) * (w_next - w)
+        if np.abs(w_next - w).max() < 1e-8:
+            w = w_next
+            break
+        w, t = w_next, t_next
+    return w
+
+
+def _zscore(x):
+    sd = x.std()
+    return (x - x.mean()) / sd if sd > 0 else np.zeros_like(x)
+
+
+def build_portfolio(ticker_df, prices, top_n=30, method='min_variance', tilt=0.5,
+                    max_weight=0.10, sectors=None, sector_cap=None, risk_free=0.0,
+                    lookback_days=5 * TRADING_DAYS, min_history=MIN_HISTORY):
+    """
+    Weights for the top_n scorers of ticker_df (needs 'Ticker' and 'Score' columns).
+
+    method='min_variance': minimise w'Σw - tilt * avg_var * z(score)'w, i.e. minimum
+        variance leaning towards higher Buy Scores (tilt=0 is plain min-variance).
+    method='max_sharpe': maximise Sharpe with expected returns blended from history and
+        score: mu = (1-tilt)*hist_mu + tilt*(mean(hist_mu) + z(score)*std(hist_mu)).
+        Solved as a sequence of warm-started mean-variance QPs (risk aversion = Sharpe/vol).
+
+    Σ is the Ledoit-Wolf shrunk covariance of daily returns. Constraints: fully invested,
+    long only, w <= max_weight, and per-sector totals <= sector_cap (float or {sector: cap})
+    when sectors ({ticker: sector}) is given.
+    Returns (weights DataFrame, stats dict).
+    """
+    top = ticker_df.dropna(subset=['Ticker']).sort_values('Score', ascending=False).head(top_n)
+    rets = daily_returns(prices, top['Ticker'], lookback_days, min_history)
+    top = top.set_index('Ticker').loc[rets.columns]
+    n = len(top)
+    if n == 0:
+        raise ValueError('none of the top tickers have enough price history')
+    if max_weight * n < 1:
+        raise ValueError(f'max_weight={max_weight} cannot be fully invested across {n} tickers')
+
+    cov, shrinkage = ledoit_wolf(rets.values)
+    score_z = _zscore(top['Score'].astype(float).values)
+
+    groups = group_caps = None
+    if sectors is not None and sector_cap is not None:
+        labels = pd.Series([sectors.get(t) or 'Unknown' for t in top.index])
+        codes, uniques = pd.factorize(labels)
+        caps = sector_cap if isinstance(sector_cap, dict) else {}
+        default = sector_cap if not isinstance(sector_cap, dict) else 1.0
+        groups, group_caps = codes, np.array([caps.get(u, default) for u in uniques], dtype=float)
+        if np.minimum(group_caps, max_weight * np.bincount(codes)).sum() < 1:
+            raise ValueError('sector caps leave the portfolio unable to be fully invested')
+
+    hist_mu = rets.values.mean(axis=0) * TRADING_DAYS
+    if method == 'min_variance':
+        avg_var = np.trace(cov) / n
+        w = _solve_qp(cov, tilt * avg_var * score_z, max_weight, groups, group_caps)
+    elif method == 'max_sharpe':
+        mu = (1 - tilt) * hist_mu + tilt * (hist_mu.mean() + score_z * hist_mu.std())
+        mu_d = mu / TRADING_DAYS - risk_free / TRADING_DAYS
+        # Dinkelbach-style fixed point: the tangency portfolio solves the mean-variance QP
+        # with risk aversion sharpe/vol, so re-solve at the current sharpe/vol until it settles
+        L = 2.0 * _max_eigenvalue(cov)
+        w = _solve_qp(cov, 2.0 * mu_d, max_weight, groups, group_caps, L=L)
+        best, best_sharpe = w, -np.inf
+        for _ in range(SHARPE_ITERS):
+            vol = np.sqrt(w @ cov @ w)
+            sharpe = (mu_d @ w) / vol if vol > 0 else -np.inf
+            if sharpe <= best_sharpe + 1e-9 * abs(sharpe):
+                break
+            best, best_sharpe = w, sharpe
+            if sharpe <= 0:
+                break
+            # max mu'w - gamma/2 w'Σw  ==  min w'Σw - (2/gamma) mu'w,  gamma = sharpe/vol
+            w = _solve_qp(cov, 2.0 * vol / sharpe * mu_d, max_weight, groups, group_caps, w, L)
+        w = best
+    else:
+        raise ValueError(f"unknown method '{method}'")
+
+    w = np.where(w < 1e-6, 0.0, w)
+    w = w / w.sum()
+    weights = pd.DataFrame({
+        'Company': top['Company'].values if 'Company' in top else None,
+        'Score': top['Score'].values,
+        'Weight': w,
+        'Vol (ann.)': np.sqrt(np.diag(cov) * TRADING_DAYS),
+        'Hist Return (ann.)': hist_mu,
+    }, index=top.index)
+    if groups is not None:
+        weights['Sector'] = labels.values
+    port_vol = np.sqrt(w @ cov @ w * TRADING_DAYS)
+    port_ret = hist_mu @ w
+    stats = {
+        'method': method,
+        'n_assets': int((w > 0).sum()),
+        'shrinkage': shrinkage,
+        'vol (ann.)': port_vol,
+        'hist return (ann.)': port_ret,
+        'hist sharpe': (port_ret - risk_free) / port_vol if port_vol > 0 else np.nan,
+        'weighted score': float(top['Score'].astype(float).values @ w),
+    }
+    return weights.sort_values('Weight', ascending=False), stats
+
+
+def sectors_from_bundles(bundles):
+    return {b['fund'].get('symbol'): b['fund'].get('sector') for b in bundles}
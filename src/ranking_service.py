@@ -0,0 +1,195 @@
+import json
+import asyncio
+import datetime as dt
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from src.helper_functions import score_label
+from src.data_fetch import fetch_bundle
+from src.vector_scoring import inputs_matrix, pillar_matrix, composite_scores, ticker_frame, PILLARS
+
+
+class StaticProvider:
+    """Fake provider for tests / offline use: serves fixed bundles keyed by ticker."""
+
+    def __init__(self, bundles):
+        if isinstance(bundles, dict):
+            self.bundles = dict(bundles)
+        else:
+            self.bundles = {b['fund'].get('symbol'): b for b in bundles}
+
+    def __call__(self, ticker):
+        if ticker not in self.bundles:
+            raise KeyError(f'no bundle for {ticker}')
+        return self.bundles[ticker]
+
+
+class RankingCache:
+    """
+    Latest bundles, their pillar matrix and ticker_df, kept warm in memory (one
+    score_inputs pass per refresh). Re-rankings with custom weights are a single
+    matrix-vector product over the cached pillars.
+    """
+
+    def __init__(self, tickers, importance_factors, provider=fetch_bundle):
+        self.tickers = list(dict.fromkeys(tickers))
+        self.importance_factors = dict(importance_factors)
+        self.provider = provider
+        self.snapshot = None
+        self.errors = {}
+
+    def refresh(self):
+        """Fetch and score everything, then swap the snapshot in one assignment."""
+        bundles, fetched, errors = [], [], {}
+        for t in self.tickers:
+            try:
+                bundles.append(self.provider(t))
+                fetched.append(t)
+            except Exception as e:
+                errors[t] = str(e)
+        X, names = inputs_matrix(bundles)
+        names['Ticker'] = fetched
+        P = pillar_matrix(X)
+        ticker_df = ticker_frame(X, P, names, self.importance_factors)
+        self.snapshot = {
+            'bundles': dict(zip(fetched, bundles)),
+            'names': names,
+            'pillars': P,
+            'ticker_df': ticker_df.set_index('Ticker', drop=False),
+            'refreshed_at': dt.datetime.now().isoformat(timespec='seconds'),
+        }
+        self.errors = errors
+        return self.snapshot
+
+    def rankings(self, importance_factors=None, top=None):
+        snap = self.snapshot
+        weights = dict(self.importance_factors, **(importance_factors or {}))
+        scores = composite_scores(snap['pillars'], weights)
+        order = np.argsort(-scores, kind='stable')[:top]
+        return [{'rank': r + 1,
+                 'ticker': snap['names']['Ticker'].iloc[i],
+                 'company': snap['names']['Company'].iloc[i],
+                 'score': round(float(scores[i]), 1),
+                 'label': score_label(round(float(scores[i]), 1))}
+                for r, i in enumerate(order)]
+
+    def ticker_row(self, ticker):
+        df = self.snapshot['ticker_df']
+        if ticker not in df.index:
+            return None
+        row = {k: (v.item() if isinstance(v, np.generic) else v) for k, v in df.loc[ticker].items()}
+        return {k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in row.items()}
+
+
+def _response(status, payload):
+    body = json.dumps(payload, default=str).encode()
+    reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 503: 'Service Unavailable'}[status]
+    head = (f'HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n')
+    return head.encode() + body
+
+
+def _top(value):
+    """Parse a 'top' parameter: None, or an integer >= 1."""
+    if value is None:
+        return None
+    top = int(value)
+    if top < 1:
+        raise ValueError(f'top must be >= 1, got {top}')
+    return top
+
+
+async def handle(cache, method, target, body):
+    """Route one request -> (status, payload). Kept separate from the socket code for testing."""
+    url = urlsplit(target)
+    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+    parts = [p for p in url.path.split('/') if p]
+    try:
+        top = _top(query.get('top'))
+    except ValueError as e:
+        return 400, {'error': str(e)}
+
+    if parts == ['health']:
+        return 200, {'ok': True, 'refreshed_at': cache.snapshot and cache.snapshot['refreshed_at'],
+                     'tickers': len(cache.tickers), 'errors': cache.errors}
+    if cache.snapshot is None:
+        return 503, {'error': 'cache is warming up'}
+    if method == 'GET' and parts == ['rankings']:
+        return 200, {'refreshed_at': cache.snapshot['refreshed_at'], 'rankings': cache.rankings(top=top)}
+    if method == 'GET' and len(parts) == 2 and parts[0] == 'ticker':
+        row = cache.ticker_row(parts[1])
+        return (200, row) if row is not None else (404, {'error': f'unknown ticker {parts[1]}'})
+    if method == 'POST' and parts == ['rerank']:
+        try:
+            req = json.loads(body or b'{}')
+            weights = req.get('weights', {})
+            bad = set(weights) - set(PILLARS)
+            if bad:
+                return 400, {'error': f'unknown pillars {sorted(bad)}'}
+            weights = {k: float(v) for k, v in weights.items()}
+            bad = sorted(k for k, v in weights.items() if not np.isfinite(v))
+            if bad:
+                return 400, {'error': f'non-finite weights for {bad}'}
+            top = _top(req['top']) if req.get('top') is not None else top
+        except (ValueError, TypeError, AttributeError) as e:
+            return 400, {'error': str(e)}
+        return 200, {'weights': dict(cache.importance_factors, **weights),
+                     'rankings': cache.rankings(weights, top=top)}
+    return 404, {'error': f'no route for {method} {url.path}'}
+
+
+async def _serve_connection(cache, reader, writer):
+    try:
+        request_line = (await reader.readline()).decode().strip()
+        method, target, _ = request_line.split(' ', 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode().strip()
+            if not line:
+                break
+            k, _, v = line.partition(':')
+            headers[k.strip().lower()] = v.strip()
+        length = int(headers.get('content-length', 0))
+        body = await reader.readexactly(length) if length else b''
+        status, payload = await handle(cache, method.upper(), target, body)
+    except (ValueError, asyncio.IncompleteReadError) as e:
+        status, payload = 400, {'error': str(e)}
+    writer.write(_response(status, payload))
+    await writer.drain()
+    writer.close()
+
+
+async def _refresh_loop(cache, refresh_every):
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            # provider calls block (network), keep them off the event loop
+            await loop.run_in_executor(None, cache.refresh)
+        except Exception as e:
+            print(f'refresh failed: {e}')
+        await asyncio.sleep(refresh_every)
+
+
+async def serve(cache, host='127.0.0.1', port=8765, refresh_every=3600):
+    """
+    Serve the cache over HTTP/JSON on host:port (local only by default):
+      GET  /health, GET /rankings?top=N, GET /ticker/<symbol>,
+      POST /rerank  {"weights": {"growth": 0.4, ...}, "top": N}
+    and refresh it in the background every refresh_every seconds.
+    """
+    server = await asyncio.start_server(lambda r, w: _serve_connection(cache, r, w), host, port)
+    refresher = asyncio.create_task(_refresh_loop(cache, refresh_every))
+    print(f'ranking service on http://{host}:{port}')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        refresher.cancel()
+
+
+if __name__ == "__main__":
+    importance_factors = {'growth': 0.3, 'profitability': 0.3, 'valuation': 0.15, 'safety': 0.12,
+                          'stability': 0.13, 'moat': 0, 'rd_score': 0, 'invest_score': 0}
+    tickers = ["NVDA", "AMD", "TSM", "ASML", "AMAT", "KLAC", "LRCX"]
+    asyncio.run(serve(RankingCache(tickers, importance_factors)))
@@ -0,0 +1,210 @@
+import os
+import json
+import pickle
+import datetime as dt
+
+import pandas as pd
+import numpy as np
+import yfinance as yf
+
+from src.data_fetch import fetch_bundle
+from src.batch_runner import _safe_name, BUNDLE_DIR
+from src.helper_functions import _atomic_pickle
+
+
+SCHEDULE_FILE = 'schedule.json'
+QUARTER_DAYS = 91          # period spacing assumed when a ticker has < 2 quarterly columns
+REPORT_LAG_DAYS = 45       # period end -> filing, when info has no usable earnings date
+RECHECK_DAYS = 3           # after an expected report date, recheck after this many days, doubling per miss
+MAX_RECHECK_DOUBLINGS = 2  # ... up to RECHECK_DAYS * 2**2 days between rechecks
+OVERDUE_CAP_DAYS = 14      # overdue tickers further past their date than this share the same urgency
+MAX_AGE_DAYS = 120         # refetch regardless of the calendar once a bundle is this old
+PRICE_EVERY = dt.timedelta(days=1)
+
+_DATE_FIELDS = ['last_period', 'expected_next', 'last_fetch', 'last_attempt', 'last_price']
+
+
+def _info_date(info, key):
+    v = info.get(key)
+    if isinstance(v, (int, float)) and v > 0:
+        return pd.Timestamp(v, unit='s').normalize()
+    return None
+
+
+def expected_next_report(info, inc_q):
+    """
+    (latest statement period, expected date of the next report). The next period end is
+    inferred from the quarterly column spacing; the report date comes from info's earnings
+    timestamps when one falls after that period end, else period end + the filing lag
+    observed on the last report (REPORT_LAG_DAYS if unknown).
+    """
+    periods = pd.DatetimeIndex(inc_q.columns) if inc_q is not None and not inc_q.empty else pd.DatetimeIndex([])
+    last = periods.max() if len(periods) else _info_date(info, 'mostRecentQuarter')
+    if last is None:
+        return None, None
+    spacing = (pd.Timedelta(np.median(np.diff(np.sort(periods.values)))) if len(periods) >= 2
+               else pd.Timedelta(days=QUARTER_DAYS))
+    next_end = last + spacing
+
+    lag = pd.Timedelta(days=REPORT_LAG_DAYS)
+    for key in ('earningsTimestampStart', 'earningsTimestamp', 'earningsTimestampEnd'):
+        d = _info_date(info, key)
+        if d is None:
+            continue
+        if d > next_end:
+            return last, d
+        if last < d <= next_end:
+            lag = min(max(d - last, pd.Timedelta(days=10)), pd.Timedelta(days=120))
+    return last, next_end + lag
+
+
+def read_schedule(store_dir):
+    path = os.path.join(store_dir, SCHEDULE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_schedule(store_dir, schedule):
+    path = os.path.join(store_dir, SCHEDULE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(schedule, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def schedule_frame(schedule, tickers=None):
+    """Schedule as a DataFrame (one row per ticker, date columns parsed)."""
+    tickers = list(schedule) if tickers is None else list(dict.fromkeys(tickers))
+    df = pd.DataFrame([schedule.get(t, {}) for t in tickers], index=pd.Index(tickers, name='Ticker'))
+    for c in _DATE_FIELDS:
+        df[c] = pd.to_datetime(df[c]) if c in df else pd.NaT
+    df['failures'] = df['failures'].fillna(0).astype(int) if 'failures' in df else 0
+    return df
+
+
+def plan_cycle(schedule, tickers, budget, now=None):
+    """
+    Tickers to fully refetch this cycle, at most `budget`, in priority order:
+      1. never fetched;
+      2. expected report date has passed and the last attempt was >= RECHECK_DAYS ago
+         (longest overdue first, up to OVERDUE_CAP_DAYS, since those filings are the most
+         likely to be out);
+      3. bundle older than MAX_AGE_DAYS (oldest first).
+    Everything else is left alone: its statements are not expected to have changed.
+    """
+    now = pd.Timestamp(now or dt.datetime.now())
+    df = schedule_frame(schedule, tickers)
+    since_attempt = now - df['last_attempt']
+    backoff = pd.to_timedelta(RECHECK_DAYS * 2.0 ** df['failures'].clip(upper=5), unit='D')
+    may_retry = df['last_attempt'].isna() | (since_attempt >= backoff)
+
+    never = df['last_fetch'].isna() & may_retry
+    due = ~never & (df['expected_next'] <= now) & may_retry
+    stale = ~never & ~due & ((now - df['last_fetch']) >= pd.Timedelta(days=MAX_AGE_DAYS)) & may_retry
+
+    df['priority'] = np.select([never, due, stale], [3, 2, 1], 0)
+    df['urgency'] = np.select([due, stale], [(now - df['expected_next']).dt.days.clip(upper=OVERDUE_CAP_DAYS),
+                                             (now - df['last_fetch']).dt.days], 0)
+    picked = df[df['priority'] > 0].sort_values(['priority', 'urgency'], ascending=False, kind='stable')
+    return picked.index[:budget].tolist()
+
+
+def plan_price_refresh(schedule, tickers, budget=None, every=PRICE_EVERY, now=None, skip=()):
+    """Fetched tickers whose info (price, market cap, multiples) is older than `every`, oldest first."""
+    now = pd.Timestamp(now or dt.datetime.now())
+    df = schedule_frame(schedule, tickers)
+    last = df['last_price'].fillna(df['last_fetch'])
+    stale = df['last_fetch'].notna() & ((now - last) >= every) & ~df.index.isin(list(skip))
+    return last[stale].sort_values(kind='stable').index[:budget].tolist()
+
+
+def _recheck_date(entry, last, expected, now):
+    """
+    (expected_next, stale_checks) after a full fetch. While the expected report has not
+    shown up, the next check moves RECHECK_DAYS * 2**k days out for the k-th miss in a row,
+    so a late filer is not refetched every RECHECK_DAYS forever; a new period resets k.
+    """
+    k = 0 if last != entry.get('last_period') else entry.get('stale_checks', 0)
+    if expected is not None and expected <= now:
+        expected = now.normalize() + pd.Timedelta(days=RECHECK_DAYS * 2 ** min(k, MAX_RECHECK_DOUBLINGS))
+        k += 1
+    return expected, k
+
+
+def _fetch_info(ticker):
+    return yf.Ticker(ticker).info
+
+
+def _bundle_path(store_dir, ticker):
+    return os.path.join(store_dir, BUNDLE_DIR, _safe_name(ticker) + '.pkl')
+
+
+def load_store_bundles(store_dir, tickers=None):
+    """Latest stored bundle of every ticker (in `tickers` order) that has one."""
+    tickers = read_schedule(store_dir) if tickers is None else tickers
+    bundles = []
+    for t in tickers:
+        path = _bundle_path(store_dir, t)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                bundles.append(pickle.load(f))
+    return bundles
+
+
+def run_cycle(store_dir, tickers, budget=50, price_budget=None, price_every=PRICE_EVERY,
+              fetch=fetch_bundle, fetch_info=_fetch_info, now=None):
+    """
+    One scheduler cycle over store_dir (bundles/ + schedule.json): full fetches for the
+    tickers plan_cycle picks within `budget`, then info-only refreshes for the ones whose
+    price data is older than price_every (up to price_budget). Call it as often as you like:
+    a cycle with nothing due costs no requests.
+    Returns {'fetched', 'new_period', 'failed', 'price_refreshed'}.
+    """
+    os.makedirs(os.path.join(store_dir, BUNDLE_DIR), exist_ok=True)
+    now = pd.Timestamp(now or dt.datetime.now())
+    stamp = now.isoformat(timespec='seconds')
+    schedule = read_schedule(store_dir)
+    summary = {'fetched': [], 'new_period': [], 'failed': {}, 'price_refreshed': []}
+
+    for t in plan_cycle(schedule, tickers, budget, now):
+        entry = schedule.setdefault(t, {})
+        entry['last_attempt'] = stamp
+        print(f'scraping: {t}')
+        try:
+            bundle = fetch(t)
+            _atomic_pickle(bundle, _bundle_path(store_dir, t))
+        except Exception as e:
+            print(f'error scraping {t}: {e}')
+            entry['failures'] = entry.get('failures', 0) + 1
+            summary['failed'][t] = str(e)
+            continue
+        last, expected = expected_next_report(bundle['fund'], bundle.get('inc_q'))
+        last = last and last.date().isoformat()
+        if last != entry.get('last_period'):
+            summary['new_period'].append(t)
+        expected, stale_checks = _recheck_date(entry, last, expected, now)
+        entry.update(last_period=last, expected_next=expected and expected.date().isoformat(),
+                     stale_checks=stale_checks, last_fetch=stamp, last_price=stamp, failures=0)
+        summary['fetched'].append(t)
+    _write_schedule(store_dir, schedule)
+
+    for t in plan_price_refresh(schedule, tickers, price_budget, price_every, now, skip=summary['fetched']):
+        try:
+            info = fetch_info(t)
+            with open(_bundle_path(store_dir, t), 'rb') as f:
+                bundle = pickle.load(f)
+            bundle['fund'] = info
+            _atomic_pickle(bundle, _bundle_path(store_dir, t))
+        except Exception as e:
+            print(f'error refreshing info for {t}: {e}')
+            continue
+        # fresh info may carry a newly announced earnings date; one already past keeps the recheck date
+        last, expected = expected_next_report(info, bundle.get('inc_q'))
+        if (expected is None or expected <= now) and schedule[t].get('expected_next'):
+            expected = pd.Timestamp(schedule[t]['expected_next'])
+        schedule[t].update(last_period=last and last.date().isoformat(),
+                           expected_next=expected and expected.date().isoformat(), last_price=stamp)
+        summary['price_refreshed'].append(t)
+    _write_schedule(store_dir, schedule)
+    return summary
@@ -0,0 +1,130 @@
+import os
+import gzip
+import pickle
+import time
+import datetime as dt
+
+import yfinance as yf
+
+from src.buy_logic import rank_stocks
+from src.data_fetch import fetch_bundle
+from src.batch_runner import read_journal, load_bundles
+
+
+ARCHIVE_VERSION = 1
+
+
+class RecordingProvider:
+    """
+    Wraps a live provider (yfinance fetch_bundle by default) and keeps every response,
+    info dict and statements alike, plus failures, for save() to write as one archive.
+    Usable as a context manager that saves on exit.
+    """
+
+    def __init__(self, archive_path, fetch=fetch_bundle):
+        self.archive_path = archive_path
+        self.fetch = fetch
+        self.bundles = {}
+        self.errors = {}
+
+    def __call__(self, ticker):
+        try:
+            bundle = self.fetch(ticker)
+        except Exception as e:
+            self.errors[ticker] = f'{type(e).__name__}: {e}'
+            raise
+        self.bundles[ticker] = bundle
+        self.errors.pop(ticker, None)
+        return bundle
+
+    def save(self):
+        write_archive(self.archive_path, self.bundles, self.errors)
+        return self.archive_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
+
+
+class ReplayProvider:
+    """
+    Serves a recorded archive with zero network calls. Tickers that failed while
+    recording fail again the same way; tickers never recorded raise KeyError.
+    """
+
+    def __init__(self, archive_path):
+        archive = read_archive(archive_path)
+        self.meta = archive['meta']
+        self.bundles = archive['bundles']
+        self.errors = archive['errors']
+
+    @property
+    def tickers(self):
+        return list(self.meta['tickers'])
+
+    def __call__(self, ticker):
+        if ticker in self.bundles:
+            return self.bundles[ticker]
+        if ticker in self.errors:
+            raise RuntimeError(f'recorded failure for {ticker}: {self.errors[ticker]}')
+        raise KeyError(f'{ticker} not in archive')
+
+    def all_bundles(self, tickers=None):
+        """Bundles in recorded (or given) order, skipping failures — ready for rank_stocks."""
+        return [self.bundles[t] for t in (tickers or self.tickers) if t in self.bundles]
+
+
+def write_archive(path, bundles, errors=None):
+    """One gzip-compressed pickle holding every bundle; written atomically."""
+    archive = {
+        'meta': {
+            'version': ARCHIVE_VERSION,
+            'recorded_at': dt.datetime.now().isoformat(timespec='seconds'),
+            'yfinance': getattr(yf, '__version__', None),
+            'tickers': list(bundles) + [t for t in (errors or {}) if t not in bundles],
+        },
+        'bundles': dict(bundles),
+        'errors': dict(errors or {}),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with gzip.open(tmp, 'wb', compresslevel=6) as f:
+        pickle.dump(archive, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def read_archive(path):
+    with gzip.open(path, 'rb') as f:
+        archive = pickle.load(f)
+    if archive['meta'].get('version') != ARCHIVE_VERSION:
+        raise ValueError(f"unsupported archive version {archive['meta'].get('version')} in {path}")
+    return archive
+
+
+def archive_run(run_dir, archive_path):
+    """Pack the bundles journaled by a src.batch_runner run into a replay archive."""
+    state = read_journal(run_dir)
+    done = [t for t, s in state.items() if s['status'] == 'done']
+    bundles = dict(zip(done, load_bundles(run_dir, done)))
+    errors = {t: s.get('error') for t, s in state.items() if s['status'] in ('failed', 'dead')}
+    write_archive(archive_path, bundles, errors)
+    return archive_path
+
+
+def benchmark_rank(archive_path, importance_factors, repeat=3):
+    """
+    Time load + rank_stocks on an archive. Run it from two checkouts on the same archive
+    and compare the timings and the returned ticker_df (e.g. with DataFrame.compare).
+    """
+    timings = {'load': [], 'rank': []}
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        bundles = ReplayProvider(archive_path).all_bundles()
+        t1 = time.perf_counter()
+        rankings, ticker_df = rank_stocks(bundles, importance_factors)
+        t2 = time.perf_counter()
+        timings['load'].append(t1 - t0)
+        timings['rank'].append(t2 - t1)
+    return {k: min(v) for k, v in timings.items()}, rankings, ticker_df
@@ -0,0 +1,96 @@
+import numpy as np
+
+from src.buy_logic import SCORE_INPUTS
+from src.vector_scoring import inputs_matrix, pillar_matrix, composite_scores
+
+
+# input -> list of (model, param) applied in order. Models:
+#   'relative': x * (1 + param * N(0,1))        restatements / estimate drift
+#   'absolute': x + param * N(0,1)              noise in percentage points
+#   'pct_flip': with prob param, x*100 if |x| <= 1.5 else x/100   (_to_pct decimal-vs-percent misread)
+#   'dropout':  with prob param, x -> NaN       one side of a _blend missing / row absent
+DEFAULT_NOISE = {
+    'gm':           [('relative', 0.05), ('pct_flip', 0.01)],
+    'om':           [('relative', 0.10), ('pct_flip', 0.01)],
+    'roe':          [('relative', 0.10), ('pct_flip', 0.01)],
+    'fpe':          [('relative', 0.10)],
+    'peg':          [('relative', 0.15), ('dropout', 0.05)],
+    'ev_ebitda':    [('relative', 0.10)],
+    'rev_g':        [('absolute', 3.0), ('dropout', 0.02)],
+    'fcf_margin':   [('absolute', 3.0)],
+    'debt_eq':      [('relative', 0.10)],
+    'curr_ratio':   [('relative', 0.05)],
+    'om_change':    [('absolute', 1.0)],
+    'om_y_change':  [('absolute', 1.0)],
+    'stability':    [('absolute', 0.05), ('dropout', 0.05)],
+    'moat':         [('absolute', 0.05), ('dropout', 0.05)],
+    'rd_intensity': [('relative', 0.10), ('dropout', 0.05)],
+    'invest_ratio': [('relative', 0.10), ('dropout', 0.05)],
+}
+
+# inputs that are already 0..1 subscores: perturbed values are clipped back into range
+BOUNDED_INPUTS = {'stability': (0.0, 1.0), 'moat': (0.0, 1.0)}
+
+CHUNK = 1000   # simulations per batched pass (bounds memory at ~CHUNK x tickers x inputs floats)
+
+
+def perturb(X, n_sims, noise_models, rng):
+    """
+    [tickers, inputs] -> [n_sims, tickers, inputs] with each input's noise models applied;
+    BOUNDED_INPUTS are clipped to their range afterwards (NaN dropouts stay NaN).
+    """
+    Xs = np.broadcast_to(X, (n_sims,) + X.shape).copy()
+    for name, models in noise_models.items():
+        i = SCORE_INPUTS.index(name)
+        v = Xs[..., i]
+        for model, param in models:
+            if model == 'relative':
+                v *= 1 + param * rng.standard_normal(v.shape)
+            elif model == 'absolute':
+                v += param * rng.standard_normal(v.shape)
+            elif model == 'pct_flip':
+                flip = rng.random(v.shape) < param
+                v[:] = np.where(flip, np.where(np.abs(v) <= 1.5, v * 100, v / 100), v)
+            elif model == 'dropout':
+                v[rng.random(v.shape) < param] = np.nan
+            else:
+                raise ValueError(f"unknown noise model '{model}' for {name}")
+        if name in BOUNDED_INPUTS:
+            np.clip(v, *BOUNDED_INPUTS[name], out=v)
+    return Xs
+
+
+def robustness_ranking(bundles, importance_factors, n_sims=5000, top_k=10,
+                       noise_models=None, ci=(5, 95), seed=0):
+    """
+    Monte Carlo check on how much of the ranking survives noisy inputs: perturb every
+    ticker's raw buy_score inputs n_sims times, re-score all simulations at once and report
+    score / rank confidence intervals and P(rank <= top_k) per ticker.
+    """
+    noise_models = DEFAULT_NOISE if noise_models is None else noise_models
+    rng = np.random.default_rng(seed)
+    X, names = inputs_matrix(bundles)
+
+    base = composite_scores(pillar_matrix(X), importance_factors)
+    scores = np.empty((n_sims, len(X)))
+    for start in range(0, n_sims, CHUNK):
+        n = min(CHUNK, n_sims - start)
+        scores[start:start+n] = composite_scores(pillar_matrix(perturb(X, n, noise_models, rng)), importance_factors)
+
+    # rank 1 = best within each simulation
+    ranks = np.argsort(np.argsort(-scores, axis=1), axis=1) + 1
+    base_rank = np.argsort(np.argsort(-base)) + 1
+    lo, hi = ci
+
+    out = names.assign(**{
+        'Score': np.round(base, 1),
+        'Score Mean': scores.mean(axis=0),
+        f'Score P{lo}': np.percentile(scores, lo, axis=0),
+        f'Score P{hi}': np.percentile(scores, hi, axis=0),
+        'Rank': base_rank,
+        'Rank Median': np.median(ranks, axis=0),
+        f'Rank P{lo}': np.percentile(ranks, lo, axis=0),
+        f'Rank P{hi}': np.percentile(ranks, hi, axis=0),
+        f'P(top {top_k})': (ranks <= top_k).mean(axis=0),
+    })
+    return out.sort_values(['Rank']).reset_index(drop=True)
@@ -0,0 +1,99 @@
+import pandas as pd
+import numpy as np
+
+from src.helper_functions import score_label
+from src.vector_scoring import PILLARS
+
+
+# ticker_df column holding each pillar's 0..1 subscore
+SUBSCORE_COLUMNS = {
+    'growth': 'Growth',
+    'profitability': 'Profitability',
+    'valuation': 'Valuation',
+    'safety': 'Safety',
+    'stability': 'Stability Score (Rev- Var)',
+    'moat': 'Moat Score (G.Margin- Var)',
+    'rd_score': 'R&D Score',
+    'invest_score': 'Investment Score',
+}
+
+
+def load_run(run):
+    """A run's metric table: a ticker_df, or the path of one saved with to_csv / to_parquet."""
+    if isinstance(run, pd.DataFrame):
+        return run
+    return pd.read_parquet(run) if run.endswith('.parquet') else pd.read_csv(run)
+
+
+def _labels(scores):
+    """score_label over a float array, evaluated once per distinct score."""
+    uniq, inv = np.unique(np.nan_to_num(scores, nan=-np.inf), return_inverse=True)
+    labels = np.array([score_label(s) if np.isfinite(s) else None for s in uniq], dtype=object)
+    return labels[inv]
+
+
+def _prepare(df, key, weights):
+    cols = [SUBSCORE_COLUMNS[p] for p in PILLARS]
+    out = pd.DataFrame({key: df[key].values, 'Score': df['Score'].astype(float).values})
+    if key != 'Company' and 'Company' in df:
+        out['Company'] = df['Company'].values
+    out['Rank'] = out['Score'].rank(ascending=False, method='min')
+    out['Label'] = _labels(out['Score'].values)
+    contrib = 100 * df[cols].astype(float).values * np.array([weights[p] for p in PILLARS])
+    out[PILLARS] = contrib
+    dup = out[key].duplicated()
+    if dup.any():
+        print(f'{int(dup.sum())} duplicate {key} rows, keeping the first of each')
+    return out[~dup & out[key].notna()]
+
+
+def diff_runs(old, new, importance_factors, new_importance_factors=None, key=None):
+    """
+    Join two runs' ticker_df tables (or CSV/parquet paths) on Ticker (Company if either
+    lacks tickers) and explain every score change.
+
+    Per pillar p the attribution is 100 * (w_new[p] * sub_new[p] - w_old[p] * sub_old[p]),
+    i.e. weight x subscore delta when the weights did not change; the pillar columns sum
+    to 'Score Change' up to the rounding of Score (left in 'Residual').
+    Rows only in one run have status 'added' / 'removed'. Sorted by |Score Change|.
+    """
+    old, new = load_run(old), load_run(new)
+    if key is None:
+        has_ticker = all('Ticker' in d and d['Ticker'].notna().any() for d in (old, new))
+        key = 'Ticker' if has_ticker else 'Company'
+    w_old = importance_factors
+    w_new = new_importance_factors or importance_factors
+
+    a, b = _prepare(old, key, w_old), _prepare(new, key, w_new)
+    m = a.merge(b, on=key, how='outer', suffixes=(' old', ' new'), indicator='status')
+    m['status'] = m['status'].cat.rename_categories({'left_only': 'removed', 'right_only': 'added', 'both': 'both'})
+
+    out = pd.DataFrame({key: m[key]})
+    if 'Company old' in m:
+        out['Company'] = m['Company new'].fillna(m['Company old'])
+    out['status'] = m['status']
+    for c in ('Score', 'Rank', 'Label'):
+        out[f'{c} old'], out[f'{c} new'] = m[f'{c} old'], m[f'{c} new']
+    out['Score Change'] = m['Score new'] - m['Score old']
+    out['Rank Change'] = m['Rank old'] - m['Rank new']        # positive = moved up
+    out['Label Changed'] = (m['status'] == 'both') & (m['Label old'] != m['Label new'])
+
+    contrib = m[[p + ' new' for p in PILLARS]].values - m[[p + ' old' for p in PILLARS]].values
+    out[PILLARS] = contrib
+    out['Residual'] = out['Score Change'] - contrib.sum(axis=1)
+    order = np.argsort(-np.nan_to_num(np.abs(out['Score Change'].values), nan=-1.0), kind='stable')
+    return out.iloc[order].reset_index(drop=True)
+
+
+def label_changes(diff):
+    """Rows whose label moved, e.g. 'AVOID- WATCHLIST' -> 'ACCUMULATE- HOLD'."""
+    return diff[diff['Label Changed']]
+
+
+def explain(diff, name):
+    """Pillar contributions to one ticker's (or company's) score change, largest first."""
+    row = diff[diff.iloc[:, 0] == name]
+    if row.empty:
+        raise KeyError(f'{name} not in diff')
+    s = row.iloc[0][PILLARS + ['Residual']].astype(float)
+    return s.reindex(s.abs().sort_values(ascending=False).index)
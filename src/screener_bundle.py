@@ -0,0 +1,184 @@
+import os
+
+import pandas as pd
+import numpy as np
+
+from src.screener_panel import load_data_sheet, CRORE
+from src.canonical_schema import screener_to_canonical, to_statements
+from src.buy_logic import rank_stocks
+
+
+# Data Sheet P&L rows that make up cost of goods sold (change in inventory offsets them)
+COGS_ROWS = ['raw material cost', 'power and fuel', 'other mfr. exp']
+
+# a P&L whose interest is at least this share of sales, with no inventory, is a lender's:
+# interest is its cost of sales and gross margin does not apply
+LENDER_INTEREST_SHARE = 0.35
+
+# |value| beyond which an info ratio is a parsing artefact rather than a company; dropped
+INFO_LIMITS = {'grossMargins': 10.0, 'operatingMargins': 10.0, 'returnOnEquity': 10.0, 'forwardPE': 1e4,
+               'trailingPegRatio': 1e4, 'enterpriseToEbitda': 1e4, 'debtToEquity': 1e5, 'currentRatio': 1e3}
+
+
+def _row(df, label):
+    return df.loc[label] if label in df.index else pd.Series(np.nan, index=df.columns)
+
+
+def _first(s):
+    s = s.dropna()
+    return float(s.iloc[0]) if len(s) else None
+
+
+def _ttm(inc_q, inc_y, label):
+    """Sum of the latest 4 quarters (newest first), else the latest fiscal year."""
+    q = _row(inc_q, label).iloc[:4] if not inc_q.empty else pd.Series(dtype=float)
+    if q.notna().sum() == 4:
+        return float(q.sum())
+    return _first(_row(inc_y, label)) if not inc_y.empty else None
+
+
+def _ratio(a, b):
+    return a / b if a is not None and b not in (None, 0) and not np.isnan(b) else None
+
+
+def _is_lender(pnl, bs):
+    interest = _first(_row(pnl, 'interest')[::-1])
+    sales = _first(_row(pnl, 'sales')[::-1])
+    no_inventory = bs is None or not _row(bs, 'inventory').fillna(0.0).any()
+    return bool(interest and sales and interest / sales >= LENDER_INTEREST_SHARE and no_inventory)
+
+
+def _gross_profit(pnl, bs=None):
+    """
+    Sales less manufacturing costs, in crores (ascending columns like the Data Sheet).
+    NaN for years with no cost row filled in; None for lenders or when no year has one.
+    """
+    if _is_lender(pnl, bs):
+        return None
+    costs = pnl.reindex(COGS_ROWS + ['change in inventory'])
+    reported = costs.loc[COGS_ROWS].notna().any()
+    if not reported.any():
+        return None
+    costs = costs.fillna(0.0)
+    gp = pnl.loc['sales'] - costs.loc[COGS_ROWS].sum() + costs.loc['change in inventory']
+    return gp.where(reported)
+
+
+def _sane(info):
+    """info with non-finite numbers, and ratios beyond INFO_LIMITS, set to None."""
+    out = {}
+    for k, v in info.items():
+        if isinstance(v, (int, float, np.number)) and not isinstance(v, bool):
+            if not np.isfinite(v) or abs(v) > INFO_LIMITS.get(k, np.inf):
+                print(f"{info.get('symbol')}: dropping {k}={v}")
+                v = None
+        out[k] = v
+    return out
+
+
+def data_sheet_bundle(sections, meta, ticker):
+    """
+    Bundle in the shape rank_stocks expects, built from parsed Data Sheet sections
+    (src.screener_panel.load_data_sheet). Statements use yfinance labels, newest column
+    first, amounts in rupees. Derived rows: Operating Margin (%, EBIT / sales), Gross Profit
+    (annual: sales - manufacturing costs), Capital Expenditure (proxied by cash from
+    investing activity) and Free Cash Flow (operating + investing cash flow). Gross Profit is
+    left out for lenders and for years without manufacturing cost rows.
+
+    Data Sheets carry annual balance sheets and cash flows only: bs_q is the annual
+    balance sheet and cf_q holds each fiscal year's cash flow at a quarterly run-rate
+    (one quarter of the year), which keeps FCF margin and investment ratio on scale.
+    Valuation inputs are trailing: forwardPE is the TTM P/E.
+    """
+    long = screener_to_canonical(sections, ticker)
+    q, a = to_statements(long, ticker, 'Q'), to_statements(long, ticker, 'A')
+    inc_q, inc_y, cf_y, bs_y = q['inc'], a['inc'], a['cf'], a['bs']
+
+    gp = None
+    if 'pnl' in sections and 'sales' in sections['pnl'].index:
+        gp = _gross_profit(sections['pnl'], sections.get('bs'))
+    if gp is not None:
+        gp = gp * CRORE
+        gp.index = gp.index + pd.offsets.MonthEnd(0)
+        inc_y.loc['Gross Profit'] = gp.reindex(inc_y.columns)
+    for inc in (inc_q, inc_y):
+        if {'Operating Income', 'Total Revenue'} <= set(inc.index):
+            rev = inc.loc['Total Revenue']
+            om = (inc.loc['Operating Income'] / rev.where(rev != 0)) * 100
+            inc.loc['Operating Margin'] = om.where(np.isfinite(om))
+    if 'Investing Cash Flow' in cf_y.index:
+        cf_y.loc['Capital Expenditure'] = cf_y.loc['Investing Cash Flow'].clip(upper=0.0)
+        if 'Operating Cash Flow' in cf_y.index:
+            cf_y.loc['Free Cash Flow'] = cf_y.loc['Operating Cash Flow'] + cf_y.loc['Capital Expenditure']
+    cf_q = cf_y / 4
+
+    # info fields buy_score reads, computed the way yfinance reports them
+    revenue, ebit = _ttm(inc_q, inc_y, 'Total Revenue'), _ttm(inc_q, inc_y, 'Operating Income')
+    net_income = _ttm(inc_q, inc_y, 'Net Income')
+    ebitda = None
+    if ebit is not None:
+        ebitda = ebit + (_ttm(inc_q, inc_y, 'Reconciled Depreciation') or 0.0)
+    equity, debt = _first(_row(bs_y, 'Stockholders Equity')), _first(_row(bs_y, 'Total Debt'))
+    cash = _first(_row(bs_y, 'Cash And Cash Equivalents'))
+    shares = _first(_row(bs_y, 'Ordinary Shares Number'))
+    price = meta.get('current_price')
+    price = None if price is None or np.isnan(price) else float(price)
+    # META market cap is current; the share count can predate a split, so P/E is cap / earnings
+    market_cap = (meta.get('market_capitalization') or np.nan) * CRORE
+    if np.isnan(market_cap) and price and shares:
+        market_cap = price * shares
+    pe = _ratio(market_cap, net_income) if not np.isnan(market_cap) else None
+
+    ni_growth = None
+    ni_q = _row(inc_q, 'Net Income') if not inc_q.empty else pd.Series(dtype=float)
+    if ni_q.iloc[:8].notna().sum() == 8 and ni_q.iloc[4:8].sum() > 0:
+        ni_growth = (ni_q.iloc[:4].sum() / ni_q.iloc[4:8].sum() - 1) * 100
+    ev = market_cap + (debt or 0.0) - (cash or 0.0) if not np.isnan(market_cap) else None
+    current_assets = sum(v for v in (_first(_row(bs_y, 'Receivables')), _first(_row(bs_y, 'Inventory')), cash) if v)
+    bs = sections.get('bs', pd.DataFrame())
+    other_liab = _first(bs.loc['other liabilities'][::-1]) if 'other liabilities' in bs.index else None
+    debt_eq = _ratio(debt, equity)
+
+    info = _sane({
+        'symbol': ticker,
+        'longName': meta.get('company') or ticker,
+        'currency': 'INR',
+        'financialCurrency': 'INR',
+        'currentPrice': price,
+        'marketCap': market_cap,
+        'grossMargins': _first(_row(inc_y, 'Gross Profit') / _row(inc_y, 'Total Revenue').replace(0, np.nan)),
+        'operatingMargins': _ratio(ebit, revenue),
+        'returnOnEquity': _ratio(net_income, equity) if equity and equity > 0 else None,
+        'forwardPE': pe if pe and pe > 0 else None,
+        'trailingPegRatio': pe / ni_growth if pe and pe > 0 and ni_growth and ni_growth > 0 else None,
+        'enterpriseToEbitda': _ratio(ev, ebitda),
+        'debtToEquity': debt_eq * 100 if debt_eq is not None else None,
+        # Data Sheets have no current assets/liabilities split: receivables + inventory + cash
+        # against 'other liabilities' is the closest proxy
+        'currentRatio': _ratio(current_assets, other_liab * CRORE if other_liab else None),
+    })
+    return {'fund': info, 'inc_q': inc_q, 'cf_q': cf_q, 'bs_q': bs_y,
+            'inc_y': inc_y, 'cf_y': cf_y, 'bs_y': bs_y}
+
+
+def workbook_bundles(folder='portfolio_files_screener_in', tickers=None):
+    """
+    Bundles for every workbook in folder, no network. tickers maps workbook stem -> ticker
+    (e.g. {'Adani Power': 'ADANIPOWER.NS'}); unmapped workbooks use their stem.
+    """
+    bundles = []
+    for fname in sorted(os.listdir(folder)):
+        if not fname.endswith('.xlsx') or fname.startswith('~$'):
+            continue
+        stem = os.path.splitext(fname)[0]
+        try:
+            sections, meta = load_data_sheet(os.path.join(folder, fname))
+            bundles.append(data_sheet_bundle(sections, meta, (tickers or {}).get(stem, stem)))
+        except Exception as e:
+            print(f"Could not build a bundle from {fname}: {e}")
+    return bundles
+
+
+def rank_workbooks(importance_factors, folder='portfolio_files_screener_in', tickers=None):
+    """The full eight-pillar rank_stocks model over local screener.in workbooks."""
+    return rank_stocks(workbook_bundles(folder, tickers), importance_factors)
@@ -0,0 +1,275 @@
+import os
+from collections import namedtuple
+
+import pandas as pd
+import numpy as np
+
+
+# screener.in "Data Sheet" section headers (first column) -> section key
+SECTION_HEADERS = {
+    'PROFIT & LOSS': 'pnl',
+    'Quarters': 'quarters',
+    'BALANCE SHEET': 'bs',
+    'CASH FLOW:': 'cf',
+}
+
+# rows pulled into the panels: panel metric -> (section, Data Sheet label, lowercased)
+ANNUAL_ROWS = {
+    'sales':            ('pnl', 'sales'),
+    'net_profit':       ('pnl', 'net profit'),
+    'pbt':              ('pnl', 'profit before tax'),
+    'depreciation':     ('pnl', 'depreciation'),
+    'interest':         ('pnl', 'interest'),
+    'tax':              ('pnl', 'tax'),
+    'dividend_amount':  ('pnl', 'dividend amount'),
+    'equity_capital':   ('bs', 'equity share capital'),
+    'reserves':         ('bs', 'reserves'),
+    'borrowings':       ('bs', 'borrowings'),
+    'num_shares':       ('bs', 'no. of equity shares'),
+    'cash_bank':        ('bs', 'cash & bank'),
+    'cfo':              ('cf', 'cash from operating activity'),
+    'cfi':              ('cf', 'cash from investing activity'),
+    'net_cash_flow':    ('cf', 'net cash flow'),
+    'price':            ('cf', 'price:'),
+}
+
+QUARTERLY_ROWS = {
+    'sales':            ('quarters', 'sales'),
+    'expenses':         ('quarters', 'expenses'),
+    'other_income':     ('quarters', 'other income'),
+    'depreciation':     ('quarters', 'depreciation'),
+    'interest':         ('quarters', 'interest'),
+    'pbt':              ('quarters', 'profit before tax'),
+    'tax':              ('quarters', 'tax'),
+    'net_profit':       ('quarters', 'net profit'),
+    'operating_profit': ('quarters', 'operating profit'),
+}
+
+CRORE = 1e7
+
+# values: float array [company, metric, period]; periods ascending fiscal period-end dates
+Panel = namedtuple('Panel', ['companies', 'metrics', 'periods', 'values'])
+
+
+def load_data_sheet(file_path):
+    """
+    Parse a screener.in export's "Data Sheet" into
+    ({'pnl','quarters','bs','cf': DataFrame(index=lowercased label, columns=ascending Timestamps)}, meta).
+    meta holds the company name and the META block (current price, market cap, ...).
+    """
+    raw = pd.read_excel(file_path, sheet_name="Data Sheet", engine="openpyxl", header=None)
+    # a date-typed column with blank cells would go through to_numeric as NaT -> int64 min
+    raw = raw.astype(object)
+    first = raw[0].astype(str).str.strip()
+
+    meta = {'company': raw.iloc[0, 1]}
+    for label in ['Number of shares', 'Face Value', 'Current Price', 'Market Capitalization']:
+        hit = first[first == label].index
+        if len(hit):
+            meta[label.lower().replace(' ', '_')] = pd.to_numeric(raw.iloc[hit[0], 1], errors='coerce')
+
+    starts = sorted((first[first == h].index[0], key) for h, key in SECTION_HEADERS.items() if (first == h).any())
+    sections = {}
+    for i, (start, key) in enumerate(starts):
+        end = starts[i+1][0] if i+1 < len(starts) else len(raw)
+        block = raw.iloc[start+1:end]
+        header = block.iloc[0]                       # 'Report Date' row
+        dates = pd.to_datetime(header.iloc[1:], errors='coerce')
+        keep = dates.notna().values
+        body = block.iloc[1:]
+        body = body[body[0].notna()]
+        df = body.iloc[:, 1:].loc[:, keep].apply(pd.to_numeric, errors='coerce')
+        if (df < -1e17).any().any():
+            raise ValueError(f"{file_path}: NaT sentinel values in the {key} section")
+        df.columns = pd.DatetimeIndex(dates[keep])
+        df.index = body[0].astype(str).str.strip().str.lower()
+        df = df[~df.index.duplicated()]              # balance sheet carries two 'total' rows
+        sections[key] = df.sort_index(axis=1)
+    return sections, meta
+
+
+def _stack(parsed, rows, period_section):
+    periods = sorted(set().union(*[s[period_section].columns for s, _ in parsed.values() if period_section in s]))
+    periods = pd.DatetimeIndex(periods)
+    values = np.full((len(parsed), len(rows), len(periods)), np.nan)
+    for c, (sections, _) in enumerate(parsed.values()):
+        for m, (section, label) in enumerate(rows.values()):
+            df = sections.get(section)
+            if df is None or label not in df.index:
+                continue
+            values[c, m, periods.get_indexer(df.columns)] = df.loc[label].values
+    return Panel(list(parsed), list(rows), periods, values)
+
+
+def build_panels(folder='portfolio_files_screener_in'):
+    """
+    Read every workbook in folder and align them on fiscal period-end dates.
+    Returns (annual Panel, quarterly Panel, meta DataFrame indexed by company/workbook stem).
+    Periods a company doesn't report are NaN.
+    """
+    parsed = {}
+    for fname in sorted(os.listdir(folder)):
+        if not fname.endswith('.xlsx') or fname.startswith('~$'):
+            continue
+        try:
+            parsed[os.path.splitext(fname)[0]] = load_data_sheet(os.path.join(folder, fname))
+        except Exception as e:
+            print(f"Could not parse {fname}: {e}")
+    annual = _stack(parsed, ANNUAL_ROWS, 'pnl')
+    quarterly = _stack(parsed, QUARTERLY_ROWS, 'quarters')
+    meta = pd.DataFrame([m for _, m in parsed.values()], index=list(parsed))
+    return annual, quarterly, meta
+
+
+def _m(panel, name):
+    return panel.values[:, panel.metrics.index(name), :]
+
+
+def _lag_index(periods, months):
+    """Column index of the period `months` earlier (same month-end), -1 where absent."""
+    target = (periods - pd.DateOffset(months=months)) + pd.offsets.MonthEnd(0)
+    return periods.get_indexer(target)
+
+
+def _lagged(x, idx):
+    out = np.full_like(x, np.nan)
+    ok = idx >= 0
+    out[:, ok] = x[:, idx[ok]]
+    return out
+
+
+def _pct_change(x, idx):
+    prev = _lagged(x, idx)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(prev != 0, (x - prev) / prev * 100, np.nan)
+
+
+def _div(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b != 0, a / b, np.nan)
+
+
+def annual_metrics(annual):
+    """
+    All the per-year ratios of updated_analysis.py for every company at once.
+    Returns {metric: DataFrame[company x period]}; money in crores, per-share in Rs.
+    """
+    sales, net_profit, price = _m(annual, 'sales'), _m(annual, 'net_profit'), _m(annual, 'price')
+    shares = _m(annual, 'num_shares')
+    ebitda = _m(annual, 'pbt') + _m(annual, 'depreciation') + _m(annual, 'interest')
+    total_equity = _m(annual, 'equity_capital') + _m(annual, 'reserves')
+    borrowings = _m(annual, 'borrowings')
+
+    eps = _div(net_profit * CRORE, shares)
+    bvps = _div(total_equity * CRORE, shares)
+    dps = _div(_m(annual, 'dividend_amount') * CRORE, shares)
+    prev_year = _lag_index(annual.periods, 12)
+
+    out = {
+        'Sales': sales,
+        'Sales YoY %': _pct_change(sales, prev_year),
+        'Net Profit': net_profit,
+        'Net Profit YoY %': _pct_change(net_profit, prev_year),
+        'Stock Price': price,
+        'Market Cap': price * shares,
+        'EBITDA': ebitda,
+        'Dividend Amt': _m(annual, 'dividend_amount'),
+        'Book Value/Share': bvps,
+        'P/E': _div(price, eps),
+        'eps': eps,
+        'P/B': _div(price, bvps),
+        'ROE (%)': _div(net_profit, total_equity) * 100,
+        'ROCE (%)': _div(ebitda, total_equity + borrowings) * 100,
+        'Debt/Equity': _div(borrowings, total_equity),
+        'Net Assets': total_equity,
+        'Cash Flow': _m(annual, 'net_cash_flow'),
+        'Div Yield (%)': _div(dps, price) * 100,
+    }
+    return {k: pd.DataFrame(v, index=annual.companies, columns=annual.periods) for k, v in out.items()}
+
+
+def _ttm(x, periods):
+    """Sum of the 4 consecutive quarters ending at each period (NaN if any is missing)."""
+    total = x.copy()
+    for k in (3, 6, 9):
+        total = total + _lagged(x, _lag_index(periods, k))
+    return total
+
+
+def quarterly_metrics(quarterly):
+    """Margins, QoQ / YoY growth and TTM sums for every company and quarter (updated/enhanced_analysis.py)."""
+    p = quarterly.periods
+    sales, net_profit = _m(quarterly, 'sales'), _m(quarterly, 'net_profit')
+    op_profit, pbt = _m(quarterly, 'operating_profit'), _m(quarterly, 'pbt')
+    ebitda = pbt + _m(quarterly, 'depreciation') + _m(quarterly, 'interest')
+    prev_q, prev_y = _lag_index(p, 3), _lag_index(p, 12)
+
+    out = {
+        'Sales': sales,
+        'Sales QoQ %': _pct_change(sales, prev_q),
+        'Sales YoY %': _pct_change(sales, prev_y),
+        'Net Profit': net_profit,
+        'Net Profit QoQ %': _pct_change(net_profit, prev_q),
+        'Net Profit YoY %': _pct_change(net_profit, prev_y),
+        'Operating Profit': op_profit,
+        'Op Profit QoQ %': _pct_change(op_profit, prev_q),
+        'EBITDA': ebitda,
+        'Operating Margin %': _div(op_profit, sales) * 100,
+        'Net Margin %': _div(net_profit, sales) * 100,
+        'EBITDA Margin %': _div(ebitda, sales) * 100,
+        'Tax Rate %': _div(_m(quarterly, 'tax'), pbt) * 100,
+        'TTM Sales': _ttm(sales, p),
+        'TTM Net Profit': _ttm(net_profit, p),
+        'TTM EBITDA': _ttm(ebitda, p),
+    }
+    return {k: pd.DataFrame(v, index=quarterly.companies, columns=p) for k, v in out.items()}
+
+
+def _latest(df):
+    """Last non-NaN value along the period axis, per company."""
+    x = df.values
+    has = ~np.isnan(x)
+    last = np.where(has.any(axis=1), x.shape[1] - 1 - np.argmax(has[:, ::-1], axis=1), -1)
+    vals = np.where(last >= 0, x[np.arange(len(x)), np.maximum(last, 0)], np.nan)
+    return pd.Series(vals, index=df.index)
+
+
+def snapshot(annual, quarterly, meta):
+    """
+    One row per company with the enhanced_analysis.py TTM metrics:
+    latest TTM figures against the latest share count, equity and current price.
+    """
+    a, q = annual_metrics(annual), quarterly_metrics(quarterly)
+    shares = _latest(pd.DataFrame(_m(annual, 'num_shares'), index=annual.companies))
+    equity = _latest(a['Net Assets'])
+    borrowings = _latest(pd.DataFrame(_m(annual, 'borrowings'), index=annual.companies))
+    price = meta['current_price'].reindex(annual.companies).fillna(_latest(a['Stock Price']))
+
+    ttm_sales, ttm_np, ttm_ebitda = _latest(q['TTM Sales']), _latest(q['TTM Net Profit']), _latest(q['TTM EBITDA'])
+    ttm_eps = ttm_np * CRORE / shares
+    bvps = equity * CRORE / shares
+    snap = pd.DataFrame({
+        'Company': meta['company'].reindex(annual.companies),
+        'Current Stock Price': price,
+        'Market Cap (Cr)': price * shares / CRORE,
+        'TTM Sales (Cr)': ttm_sales,
+        'TTM Net Profit (Cr)': ttm_np,
+        'TTM EPS (Rs)': ttm_eps,
+        'Annual EPS (Rs)': _latest(a['eps']),
+        'P/E Ratio (TTM)': price / ttm_eps.where(ttm_eps > 0),
+        'P/E Ratio (Annual)': price / _latest(a['eps']).where(lambda s: s > 0),
+        'TTM EBITDA (Cr)': ttm_ebitda,
+        'Book Value per Share (Rs)': bvps,
+        'P/B Ratio': price / bvps.where(bvps > 0),
+        'ROE % (TTM)': ttm_np / equity.where(equity > 0) * 100,
+        'ROE % (Annual)': _latest(a['ROE (%)']),
+        'ROCE % (TTM)': ttm_ebitda / (equity + borrowings).where(lambda s: s > 0) * 100,
+        'Latest Sales YoY %': _latest(q['Sales YoY %']),
+        'Latest Net Profit YoY %': _latest(q['Net Profit YoY %']),
+    })
+    return snap
+
+
+def long_table(metrics):
+    """{metric: company x period} -> tidy frame indexed by (company, period), one column per metric."""
+    return pd.concat({k: v.stack() for k, v in metrics.items()}, axis=1).rename_axis(['company', 'period'])
@@ -0,0 +1,43 @@
+import pandas as pd
+import numpy as np
+
+from src.buy_logic import (score_inputs, bundle_name, score01, SCORE_INPUTS, PILLARS, pillar_matrix,
+                           TICKER_DF_COLUMNS)
+
+
+def inputs_matrix(bundles):
+    """
+    Raw buy_score inputs for every bundle as a float array [ticker, SCORE_INPUTS] (None -> NaN),
+    plus a frame with each row's ticker and company name.
+    """
+    rows, names = [], []
+    for b in bundles:
+        x = score_inputs(b['fund'], b['inc_q'], b['cf_q'], b['bs_q'], b['inc_y'], b['cf_y'])
+        rows.append([np.nan if v is None else float(v) for v in x.values()])
+        names.append({'Ticker': b['fund'].get('symbol'), 'Company': bundle_name(b)})
+    return np.array(rows, dtype=float).reshape(-1, len(SCORE_INPUTS)), pd.DataFrame(names)
+
+
+# ticker_df metric columns, in TICKER_DF_COLUMNS order, and the SCORE_INPUTS they come from
+_METRIC_INPUTS = ['gm', 'om', 'roe', 'fpe', 'peg', 'rev_g', 'fcf_margin', 'debt_eq', 'curr_ratio',
+                  'rd_intensity', 'invest_ratio']
+
+
+def ticker_frame(X, P, names, importance_factors):
+    """rank_stocks' ticker_df built from an inputs matrix and its pillar matrix, no re-extraction."""
+    cols = [SCORE_INPUTS.index(k) for k in _METRIC_INPUTS]
+    scores = [round(float(s) * 100, 1) for s in score01(P, importance_factors)]
+    values = np.column_stack([X[:, cols], P, np.array(scores).reshape(-1, 1)])
+    df = pd.DataFrame(values, columns=TICKER_DF_COLUMNS[2:])
+    df.insert(0, 'Ticker', names['Ticker'].values)
+    df.insert(0, 'Company', names['Company'].values)
+    return df
+
+
+def weight_vector(importance_factors):
+    return np.array([importance_factors[p] for p in PILLARS], dtype=float)
+
+
+def composite_scores(P, importance_factors):
+    """Buy Score (0..100, unrounded) from a pillar matrix [..., PILLARS]."""
+    return 100 * (P @ weight_vector(importance_factors))